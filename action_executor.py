@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+import queue
+import threading
+import time
+from typing import Callable, Dict
+
+import gi
+
+gi.require_version('Gtk', '3.0')
+from gi.repository import GLib
+
+
+# Queue sentinel asking the worker to exit
+_STOP = object()
+
+
+class ActionStats:
+    __slots__ = ('count', 'superseded', 'total_run', 'max_run', 'total_wait')
+
+    def __init__(self):
+        self.count = 0
+        self.superseded = 0
+        self.total_run = 0.0
+        self.max_run = 0.0
+        self.total_wait = 0.0
+
+    def record(self, wait: float, run: float):
+        self.count += 1
+        self.total_wait += wait
+        self.total_run += run
+        if run > self.max_run:
+            self.max_run = run
+
+    def as_dict(self) -> Dict[str, float]:
+        count = self.count or 1
+        return {
+            'count': self.count,
+            'superseded': self.superseded,
+            'avg_wait_ms': self.total_wait / count * 1000,
+            'avg_run_ms': self.total_run / count * 1000,
+            'max_run_ms': self.max_run * 1000,
+        }
+
+
+class ActionExecutor:
+    """Runs window actions on a worker thread so backend I/O never blocks GTK.
+
+    Actions are queued in a bounded queue, when it is full new actions are
+    rejected rather than piling up behind a stuck backend. Actions submitted
+    with a key (the target window) coalesce: while one is still pending, a
+    newer action for the same key replaces it. Anything touching widgets
+    must go back through run_on_main().
+    """
+
+    def __init__(self, max_pending: int = 32):
+        # The queue only carries keys, the latest entry per key is in _pending
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats: Dict[str, ActionStats] = {}
+        self.rejected = 0
+        self.superseded = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='themis-actions', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        try:
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=1)
+        self._thread = None
+
+    def submit(self, name: str, callback: Callable, *args, key=None) -> bool:
+        entry = (name, callback, args, time.monotonic())
+        with self._lock:
+            if key is not None and key in self._pending:
+                # Latest wins, the queued slot for this key now runs the new entry
+                self._get_stats(self._pending[key][0]).superseded += 1
+                self._pending[key] = entry
+                self.superseded += 1
+                return True
+
+            if key is None:
+                key = object()
+            self._pending[key] = entry
+            try:
+                self._queue.put_nowait(key)
+            except queue.Full:
+                del self._pending[key]
+                self.rejected += 1
+                print(f"Action queue full, dropping {name}")
+                return False
+        return True
+
+    @staticmethod
+    def run_on_main(callback: Callable, *args):
+        """Schedule callback(*args) once on the GTK main loop"""
+        def invoke():
+            callback(*args)
+            return False
+        GLib.idle_add(invoke)
+
+    def _get_stats(self, name: str) -> ActionStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = ActionStats()
+        return stats
+
+    def _run(self):
+        while True:
+            key = self._queue.get()
+            if key is _STOP:
+                return
+            with self._lock:
+                name, callback, args, submitted = self._pending.pop(key)
+            started = time.monotonic()
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Action {name} failed: {e}")
+            finished = time.monotonic()
+            with self._lock:
+                self._get_stats(name).record(started - submitted, finished - started)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            actions = {name: stats.as_dict() for name, stats in self._stats.items()}
+        return {
+            'queue_depth': self.queue_depth,
+            'rejected': self.rejected,
+            'superseded': self.superseded,
+            'actions': actions,
+        }
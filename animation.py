@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import gi
+
+gi.require_version('Gdk', '3.0')
+from gi.repository import Gdk, GLib
+
+Rect = Tuple[int, int, int, int]
+
+# Duration of a transition at animation_speed 1.0
+BASE_DURATION = 0.2
+DEFAULT_REFRESH_RATE = 60.0
+
+
+def ease_out_cubic(t: float) -> float:
+    t = 1.0 - t
+    return 1.0 - t * t * t
+
+
+class _Animation:
+    __slots__ = ('window', 'start', 'target', 'start_time', 'duration', 'current')
+
+    def __init__(self, window, start: Rect, target: Rect, start_time: float, duration: float):
+        self.window = window
+        self.start = start
+        self.target = target
+        self.start_time = start_time
+        self.duration = duration
+        self.current = start
+
+    def geometry_at(self, now: float) -> Tuple[Rect, bool]:
+        progress = min(1.0, (now - self.start_time) / self.duration)
+        if progress >= 1.0:
+            return self.target, True
+        eased = ease_out_cubic(progress)
+        geometry = tuple(int(round(s + (t - s) * eased)) for s, t in zip(self.start, self.target))
+        return geometry, False
+
+
+class WindowAnimator:
+    """Interpolates window geometry on a timer paced to the display refresh.
+
+    Progress is derived from the clock, not from a frame counter, so when
+    the backend is slower than a frame the intermediate frames are simply
+    skipped. A new target for a window that is already animating replaces
+    the old one and continues from the current interpolated geometry.
+
+    Frame timing stays on the main loop. With submit (ActionExecutor.submit)
+    each frame's move is handed to the action worker, keyed per window so a
+    frame the worker has not reached yet is replaced by the newer one.
+    """
+
+    def __init__(self, window_manager, clock: Callable[[], float] = time.monotonic,
+                 submit: Optional[Callable] = None):
+        self.window_manager = window_manager
+        self.clock = clock
+        self.submit = submit
+        self.frame_interval = 1.0 / self._get_refresh_rate()
+        self._animations: Dict[object, _Animation] = {}
+        self._source = None
+        self._last_tick = None
+        self.stats = {
+            'animations': 0,
+            'coalesced': 0,
+            'frames': 0,
+            'dropped_frames': 0,
+        }
+
+    def _get_refresh_rate(self) -> float:
+        try:
+            display = Gdk.Display.get_default()
+            monitor = display.get_primary_monitor() or display.get_monitor(0)
+            rate = monitor.get_refresh_rate() / 1000.0
+            if rate > 0:
+                return rate
+        except Exception:
+            pass
+        return DEFAULT_REFRESH_RATE
+
+    def animate(self, window, x: int, y: int, width: int, height: int, speed: float = 1.0):
+        target = (x, y, width, height)
+        key = self.window_manager.get_window_key(window)
+        now = self.clock()
+
+        running = self._animations.get(key)
+        if running:
+            start = running.current
+            self.stats['coalesced'] += 1
+        else:
+            start = self.window_manager.get_window_geometry(window)
+
+        duration = BASE_DURATION / speed if speed > 0 else 0
+        if not start or duration <= 0 or tuple(start) == target:
+            self._animations.pop(key, None)
+            self._move(key, window, target)
+            return
+
+        self._animations[key] = _Animation(window, tuple(start), target, now, duration)
+        self.stats['animations'] += 1
+        if self._source is None:
+            self._last_tick = now
+            self._source = GLib.timeout_add(max(1, int(self.frame_interval * 1000)), self._tick)
+
+    def cancel(self, window):
+        self._animations.pop(self.window_manager.get_window_key(window), None)
+
+    def _move(self, key, window, geometry: Rect):
+        if self.submit:
+            self.submit('animation_frame', self.window_manager.move_resize_window,
+                        window, *geometry, key=('frame', key))
+        else:
+            self.window_manager.move_resize_window(window, *geometry)
+
+    def _tick(self) -> bool:
+        now = self.clock()
+        late = (now - self._last_tick) / self.frame_interval
+        if late >= 1.5:
+            self.stats['dropped_frames'] += round(late) - 1
+        self._last_tick = now
+        self.stats['frames'] += 1
+
+        for key, animation in list(self._animations.items()):
+            geometry, finished = animation.geometry_at(now)
+            animation.current = geometry
+            self._move(key, animation.window, geometry)
+            if finished and self._animations.get(key) is animation:
+                del self._animations[key]
+
+        if not self._animations:
+            self._source = None
+            return False
+        return True
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats, running=len(self._animations))
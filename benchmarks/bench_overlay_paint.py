@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+"""Compare full-screen overlay repaints with damage-region repaints.
+
+Paints into an ARGB image surface the size of the overlay, the way GTK
+hands on_draw a context clipped to the invalidated area. Needs pycairo:
+
+    python benchmarks/bench_overlay_paint.py [width] [height] [updates]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cairo
+
+from snap_areas import SnapArea, draw_snap_area, intersects
+
+
+def make_areas(width: int, height: int) -> list:
+    edge, corner = 20, 100
+    return [
+        SnapArea(0, 0, edge, height, 'snap_left'),
+        SnapArea(0, 0, corner, corner, 'quarter_top_left'),
+        SnapArea(0, 0, width, edge, 'maximize'),
+        SnapArea(width - corner, 0, corner, corner, 'quarter_top_right'),
+        SnapArea(width - edge, edge, edge, height - 2 * edge, 'third_right'),
+        SnapArea(width - corner, height - corner, corner, corner, 'quarter_bottom_right'),
+        SnapArea(0, height - edge, width, edge, 'center'),
+    ]
+
+
+def paint(cr, area):
+    # Same steps as SnapOverlay.on_draw and draw_area
+    cr.set_source_rgba(0, 0, 0, 0)
+    cr.set_operator(cairo.OPERATOR_SOURCE)
+    cr.paint()
+    if area is not None and intersects(area, cr.clip_extents()):
+        draw_snap_area(cr, area)
+
+
+def bench(surface, areas, updates: int, damage: bool) -> float:
+    previous = None
+    start = time.perf_counter()
+    for i in range(updates):
+        current = areas[i % len(areas)]
+        cr = cairo.Context(surface)
+        if damage:
+            for area in (previous, current):
+                if area is not None:
+                    cr.rectangle(*area.damage_rect())
+            cr.clip()
+        paint(cr, current)
+        surface.flush()
+        previous = current
+    return (time.perf_counter() - start) / updates
+
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 3840
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 2160
+    updates = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+    areas = make_areas(width, height)
+    full = bench(surface, areas, updates, damage=False)
+    damaged = bench(surface, areas, updates, damage=True)
+    print(f"{width}x{height}, {updates} hover changes")
+    print(f"full repaint:   {full * 1000:8.3f} ms per update")
+    print(f"damage regions: {damaged * 1000:8.3f} ms per update")
+
+
+if __name__ == '__main__':
+    main()
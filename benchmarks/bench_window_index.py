@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+"""Compare recursive sway tree walks with the flattened WindowIndex.
+
+Run with: python benchmarks/bench_window_index.py [node_count]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sway_tree import WindowIndex
+
+
+def make_tree(node_count: int, depth: int = 6) -> dict:
+    """Build a synthetic tree of nested split containers"""
+    counter = [1]
+
+    def new_id():
+        counter[0] += 1
+        return counter[0]
+
+    def split(level):
+        if level == 0 or counter[0] >= node_count:
+            return {'id': new_id(), 'type': 'con', 'name': f'window {counter[0]}',
+                    'app_id': f'app{counter[0] % 50}', 'rect': {'x': 0, 'y': 0, 'width': 800, 'height': 600},
+                    'nodes': [], 'floating_nodes': []}
+        return {'id': new_id(), 'type': 'con', 'name': None,
+                'nodes': [split(level - 1) for _ in range(3)], 'floating_nodes': []}
+
+    workspaces = []
+    while counter[0] < node_count:
+        workspaces.append({'id': new_id(), 'type': 'workspace', 'name': str(len(workspaces) + 1),
+                           'nodes': [split(depth)], 'floating_nodes': []})
+    workspaces[-1]['nodes'][0]['focused'] = True
+    output = {'id': new_id(), 'type': 'output', 'name': 'DP-1', 'nodes': workspaces, 'floating_nodes': []}
+    return {'id': 1, 'type': 'root', 'nodes': [output], 'floating_nodes': []}
+
+
+# Previous WindowManager implementation, kept here for comparison
+def find_focused_window(node):
+    if node.get('focused', False):
+        return node
+    for child in node.get('nodes', []) + node.get('floating_nodes', []):
+        result = find_focused_window(child)
+        if result:
+            return result
+    return None
+
+
+def collect_windows(node, windows):
+    if node.get('type') == 'con' and node.get('name'):
+        windows.append(node)
+    for child in node.get('nodes', []) + node.get('floating_nodes', []):
+        collect_windows(child, windows)
+
+
+def recursive_queries(tree):
+    find_focused_window(tree)
+    collect_windows(tree, [])
+
+
+def main():
+    node_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    tree = make_tree(node_count)
+    index = WindowIndex(tree)
+    print(f"{len(index.nodes)} nodes, {len(index.window_ids)} windows")
+
+    runs = 20
+    recursive = min(timeit.repeat(lambda: recursive_queries(tree), number=runs, repeat=3)) / runs
+    build = min(timeit.repeat(lambda: WindowIndex(tree), number=runs, repeat=3)) / runs
+    lookups = min(timeit.repeat(lambda: (index.focused(), index.windows()), number=runs, repeat=3)) / runs
+    focused = min(timeit.repeat(index.focused, number=10000, repeat=3)) / 10000
+
+    print(f"recursive focus + window list:   {recursive * 1000:8.3f} ms per query")
+    print(f"index build (once per snapshot): {build * 1000:8.3f} ms")
+    print(f"indexed focus + window list:     {lookups * 1000:8.3f} ms per query")
+    print(f"indexed focus only:              {focused * 1e6:8.3f} us per query")
+
+
+if __name__ == '__main__':
+    main()
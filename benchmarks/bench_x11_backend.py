@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+"""Compare the Wnck and Xlib (_NET_MOVERESIZE_WINDOW) X11 move/resize paths.
+
+Run under Xvfb, optionally with a window manager started on the same
+display to include the WM's handling of the requests:
+
+    xvfb-run -a python benchmarks/bench_x11_backend.py [window_count] [rounds]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gi
+
+gi.require_version('Gdk', '3.0')
+gi.require_version('Wnck', '3.0')
+
+from gi.repository import Gdk, Wnck
+from Xlib import X, display as x_display
+
+from x11_backend import XlibBackend
+
+
+def create_windows(disp, count: int) -> list:
+    root = disp.screen().root
+    windows = []
+    for i in range(count):
+        window = root.create_window(10 * i, 10 * i, 200, 150, 0, disp.screen().root_depth,
+                                    X.InputOutput, X.CopyFromParent)
+        window.set_wm_name(f'themis-bench-{i}')
+        window.map()
+        windows.append(window)
+    disp.sync()
+    return windows
+
+
+def bench_xlib(disp, windows, rounds: int) -> float:
+    backend = XlibBackend(disp)
+    start = time.perf_counter()
+    for r in range(rounds):
+        for window in windows:
+            backend.queue_move_resize(window.id, r % 100, r % 100, 400 + r % 50, 300)
+        backend.flush()
+        # Round trip so the server has processed everything we sent
+        disp.sync()
+    return (time.perf_counter() - start) / (rounds * len(windows))
+
+
+def bench_wnck(disp, windows, rounds: int) -> float:
+    start = time.perf_counter()
+    screen = Wnck.Screen.get_default()
+    screen.force_update()
+    setup = time.perf_counter() - start
+    ids = {window.id for window in windows}
+    wnck_windows = [w for w in screen.get_windows() if w.get_xid() in ids]
+    if not wnck_windows:
+        print("Wnck did not report the test windows (no window manager running?)")
+        return float('nan')
+
+    mask = (Wnck.WindowMoveResizeMask.X | Wnck.WindowMoveResizeMask.Y |
+            Wnck.WindowMoveResizeMask.WIDTH | Wnck.WindowMoveResizeMask.HEIGHT)
+    gdk_display = Gdk.Display.get_default()
+    start = time.perf_counter()
+    for r in range(rounds):
+        for window in wnck_windows:
+            window.set_geometry(Wnck.WindowGravity.NORTHWEST, mask, r % 100, r % 100, 400 + r % 50, 300)
+        gdk_display.sync()
+    per_request = (time.perf_counter() - start) / (rounds * len(wnck_windows))
+    print(f"wnck force_update() at startup: {setup * 1000:8.3f} ms")
+    return per_request
+
+
+def main():
+    window_count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    disp = x_display.Display()
+    windows = create_windows(disp, window_count)
+
+    xlib = bench_xlib(disp, windows, rounds)
+    wnck = bench_wnck(disp, windows, rounds)
+    print(f"xlib _NET_MOVERESIZE_WINDOW: {xlib * 1e6:8.2f} us per window")
+    print(f"wnck set_geometry:           {wnck * 1e6:8.2f} us per window")
+
+    for window in windows:
+        window.destroy()
+    disp.sync()
+
+
+if __name__ == '__main__':
+    main()
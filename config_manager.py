@@ -41,6 +41,12 @@ class ConfigManager:
             'autostart': False,
             'window_margin': 5,
             'snap_threshold': 20,
+            'snap_zones': {},
+            'layouts': {},
+            'drag_preview': 'overlay',
+            'x11_backend': 'wnck',
+            'hotkey_backend': 'auto',
+            'sequence_timeout': 1000,
             'show_notifications': True,
             'debug_mode': False,
         }
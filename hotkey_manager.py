@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 
+import functools
 import os
 import threading
 import time
+from collections import deque
 from typing import Dict, Callable, Optional
 from pynput import keyboard
 from pynput.keyboard import Key, KeyCode, Listener
@@ -11,10 +13,270 @@ import gi
 gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk, GLib
 
+try:
+    from x11_hotkeys import XGrabKeyBackend
+    XGRAB_AVAILABLE = True
+except ImportError:
+    XGRAB_AVAILABLE = False
+
+# Modifier bits used in the compiled hotkey index
+MODIFIER_BITS = {Key.cmd: 1, Key.ctrl: 2, Key.alt: 4, Key.shift: 8}
+MODIFIER_MASKS = range(1 << len(MODIFIER_BITS))
+# Left and right X keysyms of each modifier bit, for XQueryKeymap
+MODIFIER_KEYSYMS = {1: (0xffeb, 0xffec), 2: (0xffe3, 0xffe4), 4: (0xffe9, 0xffea), 8: (0xffe1, 0xffe2)}
+# How often held modifiers are checked against the real keyboard
+RECONCILE_INTERVAL = 500
+
+
+# Generic modifier keys, the left/right variants are normalized to these
+_MODIFIER_NAMES = {
+    'super': Key.cmd, 'cmd': Key.cmd, 'meta': Key.cmd, 'win': Key.cmd,
+    'ctrl': Key.ctrl, 'control': Key.ctrl,
+    'alt': Key.alt,
+    'shift': Key.shift,
+}
+_KEY_ALIASES = {
+    'escape': 'esc', 'return': 'enter', 'del': 'delete', 'ins': 'insert',
+    'pageup': 'page_up', 'pgup': 'page_up', 'prior': 'page_up',
+    'pagedown': 'page_down', 'pgdn': 'page_down', 'next': 'page_down',
+    'print': 'print_screen', 'printscreen': 'print_screen',
+}
+# X keysym names of punctuation, as reported by GTK and xev
+_PUNCTUATION = {
+    'exclam': '!', 'quotedbl': '"', 'numbersign': '#', 'dollar': '$',
+    'percent': '%', 'ampersand': '&', 'apostrophe': "'", 'parenleft': '(',
+    'parenright': ')', 'asterisk': '*', 'plus': '+', 'comma': ',', 'minus': '-',
+    'period': '.', 'slash': '/', 'colon': ':', 'semicolon': ';', 'less': '<',
+    'equal': '=', 'greater': '>', 'question': '?', 'at': '@', 'bracketleft': '[',
+    'backslash': '\\', 'bracketright': ']', 'asciicircum': '^', 'underscore': '_',
+    'grave': '`', 'braceleft': '{', 'bar': '|', 'braceright': '}', 'asciitilde': '~',
+}
+# Keypad keysyms, with NumLock off the digit keys report the navigation ones
+_KEYPAD = {
+    'kp_multiply': 0xffaa, 'kp_add': 0xffab, 'kp_separator': 0xffac,
+    'kp_subtract': 0xffad, 'kp_decimal': 0xffae, 'kp_divide': 0xffaf,
+    'kp_enter': 0xff8d, 'kp_equal': 0xffbd,
+}
+_KEYPAD.update((f'kp_{digit}', 0xffb0 + digit) for digit in range(10))
+_KEYPAD_NAVIGATION = {
+    'kp_insert': 0xff9e, 'kp_end': 0xff9c, 'kp_down': 0xff99, 'kp_page_down': 0xff9b,
+    'kp_left': 0xff96, 'kp_begin': 0xff9d, 'kp_right': 0xff98, 'kp_home': 0xff95,
+    'kp_up': 0xff97, 'kp_page_up': 0xff9a, 'kp_delete': 0xff9f,
+}
+_KEYPAD_DIGITS = ('kp_0', 'kp_1', 'kp_2', 'kp_3', 'kp_4', 'kp_5', 'kp_6', 'kp_7', 'kp_8', 'kp_9',
+                  'kp_decimal')
+# Navigation keysym -> the digit keysym of the same physical key
+KEYPAD_CANONICAL = {
+    keysym: _KEYPAD[digit] for keysym, digit in zip(_KEYPAD_NAVIGATION.values(), _KEYPAD_DIGITS)
+}
+
+
+def _build_key_tables():
+    """Lower-case key name -> key, and key -> display name, built once at import"""
+    keys = {}
+    names = {}
+    for name, key in Key.__members__.items():
+        keys[name] = key
+        names.setdefault(key, name.title())
+    for name, key in _MODIFIER_NAMES.items():
+        for side in ('', '_l', '_r'):
+            keys[name + side] = key
+    for key, name in ((Key.cmd, 'Super'), (Key.ctrl, 'Ctrl'), (Key.alt, 'Alt'), (Key.shift, 'Shift')):
+        names[key] = name
+    for alias, name in _KEY_ALIASES.items():
+        if name in keys:
+            keys[alias] = keys[name]
+    for name, char in _PUNCTUATION.items():
+        key = KeyCode.from_char(char)
+        keys[name] = key
+        names[key] = name.title()
+    for name, keysym in _KEYPAD.items():
+        key = KeyCode.from_vk(keysym)
+        keys[name] = key
+        names[key] = 'KP_' + name[3:].title()
+    for name, digit in zip(_KEYPAD_NAVIGATION, _KEYPAD_DIGITS):
+        keys[name] = keys[digit]
+    for char in '0123456789abcdefghijklmnopqrstuvwxyz':
+        keys[char] = KeyCode.from_char(char)
+    return keys, names
+
+
+KEYS_BY_NAME, KEY_NAMES = _build_key_tables()
+
+
+def _split_keys(stroke: str) -> list:
+    """Split a combo on '+', a '+' where a key is expected is the key"""
+    parts = []
+    current = ''
+    for char in stroke:
+        if char == '+' and current.strip():
+            parts.append(current.strip())
+            current = ''
+        else:
+            current += char
+    parts.append(current.strip())
+    return parts
+
+
+def _split_strokes(hotkey_str: str) -> list:
+    """Split a sequence on ',', a ',' where a key is expected is the key"""
+    strokes = []
+    start = 0
+    for i, char in enumerate(hotkey_str):
+        if char == ',' and _split_keys(hotkey_str[start:i])[-1]:
+            strokes.append(hotkey_str[start:i].strip())
+            start = i + 1
+    strokes.append(hotkey_str[start:].strip())
+    return strokes
+
+
+def _parse_combo(stroke: str) -> tuple:
+    keys = []
+    for part in _split_keys(stroke):
+        key = KEYS_BY_NAME.get(part.lower())
+        if key is None and len(part) == 1 and part.isprintable():
+            # Any other character of the active layout
+            key = KeyCode.from_char(part.lower())
+        if key is None:
+            raise ValueError(f"unknown key {part!r}")
+        keys.append(key)
+    return tuple(keys)
+
+
+@functools.lru_cache(maxsize=None)
+def parse_hotkey(hotkey_str: str) -> tuple:
+    """Parse "Super+W" or a sequence such as "Super+W, 1" into key tuples.
+
+    The comma and plus keys can be written as themselves ("Super+,",
+    "Ctrl++") or by their X names ("Super+comma", "Ctrl+plus").
+    """
+    if not hotkey_str.strip():
+        return tuple()
+    try:
+        # "Super+W, 1" is a sequence of strokes, each one a combo
+        strokes = tuple(_parse_combo(stroke) for stroke in _split_strokes(hotkey_str))
+    except ValueError as e:
+        # A binding missing a key would fire on the wrong combo
+        print(f"Ignoring hotkey {hotkey_str.strip()!r}: {e}")
+        return tuple()
+    return strokes if len(strokes) > 1 else strokes[0]
+
+
+def key_name(key) -> str:
+    name = KEY_NAMES.get(key)
+    if name:
+        return name
+    if getattr(key, 'char', None):
+        return key.char.upper()
+    if hasattr(key, 'name'):
+        return key.name.title()
+    return str(key)
+
+
+def split_combo(combo: tuple):
+    """Split a combo into its modifier bitmask and its other keys"""
+    mask = 0
+    keys = []
+    for key in combo:
+        bit = MODIFIER_BITS.get(key)
+        if bit:
+            mask |= bit
+        else:
+            keys.append(key)
+    return mask, keys
+
+
+def is_sequence(combo: tuple) -> bool:
+    """True for a multi-stroke sequence, a tuple of combos"""
+    return bool(combo) and isinstance(combo[0], tuple)
+
+
+class HotkeyPrefix:
+    """Trie node for the strokes that may follow a sequence prefix"""
+    __slots__ = ('index',)
+
+    def __init__(self, index: Dict):
+        self.index = index
+
+
+def compile_hotkeys(hotkeys: Dict[tuple, Callable]) -> Dict:
+    """Compile combos into trigger key -> held modifier mask -> candidates.
+
+    Every possible modifier state is precomputed, so matching a keystroke is
+    two dict/list lookups. A combo matches only when its modifiers are
+    exactly the held ones, like the X grabs. Combos that also need other
+    keys held are tried first.
+
+    Sequences share their first stroke in a HotkeyPrefix whose index holds
+    the compiled remainder, so each stroke is matched the same way.
+    """
+    targets = {}
+    followers = {}
+    for combo, callback in hotkeys.items():
+        if is_sequence(combo):
+            if len(combo) > 1:
+                # One remaining stroke is stored as a plain combo
+                rest = combo[1] if len(combo) == 2 else combo[1:]
+                followers.setdefault(combo[0], {})[rest] = callback
+                continue
+            combo = combo[0]
+        targets[combo] = callback
+
+    for stroke, rest in followers.items():
+        if stroke in targets:
+            print(f"Hotkey {stroke} is also a sequence prefix, the sequence wins")
+        targets[stroke] = HotkeyPrefix(compile_hotkeys(rest))
+
+    entries = {}
+    for combo, target in targets.items():
+        mask, keys = split_combo(combo)
+        if not keys:
+            continue
+        # The last non-modifier key triggers, any others must already be held
+        extra = frozenset(keys[:-1])
+        entries.setdefault(keys[-1], []).append((mask, extra, target))
+
+    index = {}
+    for trigger, candidates in entries.items():
+        candidates.sort(key=lambda entry: len(entry[1]), reverse=True)
+        index[trigger] = tuple(
+            tuple((target, extra) for mask, extra, target in candidates if mask == held)
+            for held in MODIFIER_MASKS
+        )
+    return index
+
 
 class HotkeyManager:
-    def __init__(self):
+    def __init__(self, window_manager=None, backend: str = 'auto', sequence_timeout: float = 1.0):
+        self.window_manager = window_manager
+        self.backend = backend
+        # Seconds allowed between the strokes of a sequence
+        self.sequence_timeout = sequence_timeout
+        self.grab_backend = None
+        self._regrab_pending = False
+        # Only touched from the GTK thread, the listener thread reads _index,
+        # which is never mutated, only replaced as a whole
         self.hotkeys: Dict[tuple, Callable] = {}
+        self._index = {}
+        # Matched callbacks from the listener thread to the main loop.
+        # deque append/popleft are atomic, one producer and one consumer.
+        self._matched = deque()
+        self._drain_scheduled = False
+        # Sequence state, owned by whichever thread delivers key events
+        self._prefix: Optional[HotkeyPrefix] = None
+        self._prefix_deadline = 0.0
+        self._prefix_timer = None
+        self._modifier_mask = 0
+        # Modifier bit -> X keycodes, filled when the listener starts
+        self._modifier_keycodes = {}
+        self._reconcile_scheduled = False
+        # Stale modifier bits from the main loop to the listener thread, which
+        # owns _modifier_mask and pressed_keys. Same SPSC rules as _matched.
+        self._stale_modifiers = deque()
+        self._focus_handler = None
+        self.stats = {'reconciled': 0}
+        self._char_keys = {}
+        self._keypad_keys = {}
         self.pressed_keys = set()
         self.listener = None
         self.running = False
@@ -37,14 +299,119 @@ class HotkeyManager:
 
     def register_hotkey(self, key_combo: tuple, callback: Callable):
         self.hotkeys[key_combo] = callback
+        self._rebuild()
 
     def unregister_hotkey(self, key_combo: tuple):
         if key_combo in self.hotkeys:
             del self.hotkeys[key_combo]
+            self._rebuild()
+
+    def _rebuild(self):
+        self._index = compile_hotkeys(self.hotkeys)
+        if self.grab_backend and not self._regrab_pending:
+            # Registering a whole config is many calls, grab once afterwards
+            self._regrab_pending = True
+            GLib.idle_add(self._regrab)
+
+    def _regrab(self):
+        self._regrab_pending = False
+        if self.grab_backend:
+            self.grab_backend.set_grabs(self._grab_combos(), self._sequence_keys())
+        return False
+
+    def _grab_combos(self):
+        # Only first strokes are grabbed, later strokes come from a keyboard grab
+        combos = []
+        for combo in self.hotkeys:
+            if is_sequence(combo):
+                combo = combo[0]
+            mask, keys = split_combo(combo)
+            if len(keys) == 1:
+                combos.append((keys[0], mask))
+        return combos
+
+    def _sequence_keys(self):
+        keys = set()
+        for combo in self.hotkeys:
+            if is_sequence(combo):
+                for stroke in combo[1:]:
+                    keys.update(split_combo(stroke)[1])
+        return keys
+
+    def _match(self, trigger, modifiers: int, pressed_keys=None) -> Optional[Callable]:
+        """Resolve one keystroke, returns the callback to run if it completes a hotkey"""
+        prefix = self._prefix
+        if prefix is not None:
+            self._end_prefix()
+            if time.monotonic() <= self._prefix_deadline:
+                target = self._lookup(prefix.index, trigger, modifiers, pressed_keys)
+                if target is not None:
+                    return self._resolve(target)
+            # A stroke that does not continue the sequence is matched as a new one
+        return self._resolve(self._lookup(self._index, trigger, modifiers, pressed_keys))
+
+    @staticmethod
+    def _lookup(index: Dict, trigger, modifiers: int, pressed_keys):
+        by_mask = index.get(trigger)
+        if by_mask is None:
+            return None
+        for target, extra in by_mask[modifiers]:
+            if not extra or (pressed_keys is not None and extra <= pressed_keys):
+                return target
+        return None
+
+    def _resolve(self, target) -> Optional[Callable]:
+        if isinstance(target, HotkeyPrefix):
+            self._start_prefix(target)
+            return None
+        return target
+
+    def _start_prefix(self, prefix: HotkeyPrefix):
+        self._prefix = prefix
+        self._prefix_deadline = time.monotonic() + self.sequence_timeout
+        if self.grab_backend:
+            # The next stroke is not grabbed, take the whole keyboard until it
+            # arrives or the timeout expires
+            self.grab_backend.grab_keyboard()
+            self._prefix_timer = GLib.timeout_add(int(self.sequence_timeout * 1000),
+                                                  self._on_prefix_timeout)
+
+    def _end_prefix(self):
+        self._prefix = None
+        if self._prefix_timer is not None:
+            GLib.source_remove(self._prefix_timer)
+            self._prefix_timer = None
+        if self.grab_backend:
+            self.grab_backend.ungrab_keyboard()
+
+    def _on_prefix_timeout(self):
+        self._prefix_timer = None
+        self._end_prefix()
+        return False
+
+    def _on_grabbed_key(self, trigger, modifiers: int) -> bool:
+        # Grab events are already delivered on the main loop. False tells the
+        # backend the stroke is no hotkey, so it is given back to the window.
+        callback = self._match(trigger, modifiers)
+        if callback:
+            callback()
+        return callback is not None or self._prefix is not None
 
     def _normalize_key(self, key):
+        vk = getattr(key, 'vk', None)
+        if vk is not None and 0xff80 <= vk <= 0xffbd:
+            # Keypad keys keep their identity whatever NumLock says
+            vk = KEYPAD_CANONICAL.get(vk, vk)
+            normalized = self._keypad_keys.get(vk)
+            if normalized is None:
+                normalized = self._keypad_keys[vk] = KeyCode.from_vk(vk)
+            return normalized
         if hasattr(key, 'char') and key.char:
-            return KeyCode.from_char(key.char.lower())
+            # Reuse one KeyCode per character instead of allocating per keystroke
+            normalized = self._char_keys.get(key.char)
+            if normalized is None:
+                normalized = self._char_keys[key.char] = KeyCode.from_char(key.char.lower())
+            return normalized
         elif key == Key.cmd_l or key == Key.cmd_r:
             return Key.cmd
         elif key == Key.ctrl_l or key == Key.ctrl_r:
@@ -56,27 +423,152 @@ class HotkeyManager:
         return key
 
     def _on_press(self, key):
+        self._apply_stale_modifiers()
         normalized_key = self._normalize_key(key)
         self.pressed_keys.add(normalized_key)
-        
-        # Check for hotkey matches
-        for hotkey_combo, callback in self.hotkeys.items():
-            if self._matches_combo(hotkey_combo):
-                GLib.idle_add(callback)
-                return
+
+        bit = MODIFIER_BITS.get(normalized_key)
+        if bit:
+            self._modifier_mask |= bit
+            if self._modifier_keycodes and not self._reconcile_scheduled:
+                # Only poll while something is held
+                self._reconcile_scheduled = True
+                GLib.timeout_add(RECONCILE_INTERVAL, self._on_reconcile_timer)
+            return
+
+        if self._prefix is None and normalized_key not in self._index:
+            return
+        callback = self._match(normalized_key, self._modifier_mask, self.pressed_keys)
+        if callback:
+            self._post(callback)
+
+    def _post(self, callback: Callable):
+        self._matched.append(callback)
+        if not self._drain_scheduled:
+            # One idle source per wakeup, however many keystrokes matched
+            self._drain_scheduled = True
+            GLib.idle_add(self._drain_matched)
+
+    def _drain_matched(self):
+        # Clear the flag before draining so a concurrent _post is never lost
+        self._drain_scheduled = False
+        matched = self._matched
+        while matched:
+            callback = matched.popleft()
+            try:
+                callback()
+            except Exception as e:
+                print(f"Hotkey action failed: {e}")
+        return False
 
     def _on_release(self, key):
+        self._apply_stale_modifiers()
         normalized_key = self._normalize_key(key)
         self.pressed_keys.discard(normalized_key)
+        bit = MODIFIER_BITS.get(normalized_key)
+        if bit:
+            self._modifier_mask &= ~bit
+
+    def _held_modifiers(self) -> int:
+        keymap = self.window_manager.display.query_keymap()
+        self.window_manager.after_x11_round_trip()
+        held = 0
+        for bit, keycodes in self._modifier_keycodes.items():
+            for keycode in keycodes:
+                if keymap[keycode >> 3] & (1 << (keycode & 7)):
+                    held |= bit
+                    break
+        return held
+
+    def reconcile_modifiers(self) -> bool:
+        """Drop modifiers the keyboard no longer holds, after a missed release.
 
-    def _matches_combo(self, combo: tuple) -> bool:
-        return set(combo).issubset(self.pressed_keys)
+        Only queues the correction, the listener thread applies it before
+        its next key event so a press that raced the query is kept. Returns
+        True while a tracked modifier is still held.
+        """
+        mask = self._modifier_mask
+        if not self._modifier_keycodes or not mask:
+            return False
+        try:
+            held = self._held_modifiers()
+        except Exception as e:
+            print(f"Could not query keyboard state: {e}")
+            return False
+        if mask & ~held:
+            self._stale_modifiers.append(mask & ~held)
+        return bool(mask & held)
+
+    def _apply_stale_modifiers(self):
+        # Listener thread
+        while self._stale_modifiers:
+            stale = self._stale_modifiers.popleft() & self._modifier_mask
+            if not stale:
+                continue
+            self._modifier_mask &= ~stale
+            for key, bit in MODIFIER_BITS.items():
+                if stale & bit:
+                    self.pressed_keys.discard(key)
+            self.stats['reconciled'] += 1
+
+    def _on_reconcile_timer(self):
+        if self.reconcile_modifiers() and self.running:
+            return True
+        self._reconcile_scheduled = False
+        return False
+
+    def _on_active_window_changed(self, screen, previous):
+        # A lock screen or a grabbing client may have eaten the releases
+        self.reconcile_modifiers()
+
+    def _start_reconciliation(self):
+        # The pynput listener only sees events, grabs carry the real state
+        display = self.window_manager.display if self.window_manager else None
+        if display is None:
+            return
+        try:
+            self._modifier_keycodes = {
+                bit: [keycode for keysym in keysyms
+                      for keycode, _ in display.keysym_to_keycodes(keysym)]
+                for bit, keysyms in MODIFIER_KEYSYMS.items()
+            }
+        except Exception as e:
+            print(f"Modifier reconciliation unavailable: {e}")
+            return
+        screen = self.window_manager.screen
+        if screen:
+            self._focus_handler = screen.connect('active-window-changed',
+                                                 self._on_active_window_changed)
+
+    def _stop_reconciliation(self):
+        if self._focus_handler is not None:
+            self.window_manager.screen.disconnect(self._focus_handler)
+            self._focus_handler = None
+        self._modifier_keycodes = {}
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats)
+
+    def _use_grab_backend(self) -> bool:
+        return (self.backend in ('auto', 'xgrab') and XGRAB_AVAILABLE
+                and self.window_manager is not None and self.window_manager.display is not None)
 
     def start_listening(self):
         if self.running:
             return
             
         self.running = True
+        if self._use_grab_backend():
+            try:
+                self.grab_backend = XGrabKeyBackend(self.window_manager, self._on_grabbed_key)
+                self.grab_backend.set_grabs(self._grab_combos(), self._sequence_keys())
+                return
+            except Exception as e:
+                print(f"XGrabKey hotkeys unavailable, falling back to pynput: {e}")
+                if self.grab_backend:
+                    self.grab_backend.stop()
+                self.grab_backend = None
+
         try:
             self.listener = Listener(
                 on_press=self._on_press,
@@ -84,62 +576,33 @@ class HotkeyManager:
                 suppress=False
             )
             self.listener.start()
+            self._start_reconciliation()
         except Exception as e:
             print(f"Failed to start hotkey listener: {e}")
             self.running = False
 
     def stop_listening(self):
         self.running = False
+        if self._prefix is not None:
+            self._end_prefix()
+        if self.grab_backend:
+            self.grab_backend.stop()
+            self.grab_backend = None
         if self.listener:
             self.listener.stop()
             self.listener = None
+            self._stop_reconciliation()
         self.pressed_keys.clear()
+        self._modifier_mask = 0
+        self._stale_modifiers.clear()
 
     def get_hotkey_string(self, combo: tuple) -> str:
-        key_names = []
-        for key in combo:
-            if key == Key.cmd:
-                key_names.append("Super")
-            elif key == Key.ctrl:
-                key_names.append("Ctrl")
-            elif key == Key.alt:
-                key_names.append("Alt")
-            elif key == Key.shift:
-                key_names.append("Shift")
-            elif hasattr(key, 'char') and key.char:
-                key_names.append(key.char.upper())
-            elif hasattr(key, 'name'):
-                key_names.append(key.name.title())
-            else:
-                key_names.append(str(key))
-        
-        return "+".join(key_names)
+        if is_sequence(combo):
+            return ", ".join(self.get_hotkey_string(stroke) for stroke in combo)
+        return "+".join(key_name(key) for key in combo)
 
     def parse_hotkey_string(self, hotkey_str: str) -> tuple:
-        parts = [part.strip().lower() for part in hotkey_str.split('+')]
-        keys = []
-        
-        for part in parts:
-            if part in ['super', 'cmd', 'meta']:
-                keys.append(Key.cmd)
-            elif part == 'ctrl':
-                keys.append(Key.ctrl)
-            elif part == 'alt':
-                keys.append(Key.alt)
-            elif part == 'shift':
-                keys.append(Key.shift)
-            elif part == 'left':
-                keys.append(Key.left)
-            elif part == 'right':
-                keys.append(Key.right)
-            elif part == 'up':
-                keys.append(Key.up)
-            elif part == 'down':
-                keys.append(Key.down)
-            elif len(part) == 1 and part.isalnum():
-                keys.append(KeyCode.from_char(part))
-            
-        return tuple(keys) if keys else tuple()
+        return parse_hotkey(hotkey_str)
 
     def register_defaults(self, action_callbacks: Dict[str, Callable]):
         for combo, action in self.default_hotkeys.items():
@@ -147,4 +610,5 @@ class HotkeyManager:
                 self.register_hotkey(combo, action_callbacks[action])
 
     def clear_all_hotkeys(self):
-        self.hotkeys.clear()
\ No newline at end of file
+        self.hotkeys.clear()
+        self._rebuild()
\ No newline at end of file
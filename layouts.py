@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+from fractions import Fraction
+from typing import Dict, Optional, Tuple
+
+Rect = Tuple[int, int, int, int]
+
+# x, y, width and height as fractions of the workarea. 'center' places the
+# window in the middle, margin=False leaves out the window margin.
+DEFAULT_LAYOUTS = {
+    'snap_left': {'x': 0, 'y': 0, 'width': '1/2', 'height': 1},
+    'snap_right': {'x': '1/2', 'y': 0, 'width': '1/2', 'height': 1},
+    'center': {'x': 'center', 'y': 'center', 'width': '2/3', 'height': '2/3', 'margin': False},
+    'quarter_top_left': {'x': 0, 'y': 0, 'width': '1/2', 'height': '1/2'},
+    'quarter_top_right': {'x': '1/2', 'y': 0, 'width': '1/2', 'height': '1/2'},
+    'quarter_bottom_left': {'x': 0, 'y': '1/2', 'width': '1/2', 'height': '1/2'},
+    'quarter_bottom_right': {'x': '1/2', 'y': '1/2', 'width': '1/2', 'height': '1/2'},
+    'third_left': {'x': 0, 'y': 0, 'width': '1/3', 'height': 1},
+    'third_right': {'x': '2/3', 'y': 0, 'width': '1/3', 'height': 1},
+    'third_top': {'x': 0, 'y': 0, 'width': 1, 'height': '1/3'},
+    'third_bottom': {'x': 0, 'y': '2/3', 'width': 1, 'height': '1/3'},
+}
+
+CENTER = 'center'
+
+
+def parse_fraction(value, name: str) -> Fraction:
+    """Parse 1, 0.5 or "1/2" into a Fraction between 0 and 1"""
+    if isinstance(value, bool):
+        raise ValueError(f"{name} must be a fraction, got {value!r}")
+    try:
+        fraction = Fraction(str(value).strip()) if isinstance(value, str) else Fraction(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        raise ValueError(f"{name} must be a fraction, got {value!r}")
+    if not 0 <= fraction <= 1:
+        raise ValueError(f"{name} must be between 0 and 1, got {value!r}")
+    return fraction
+
+
+class Layout:
+    __slots__ = ('name', 'x', 'y', 'width', 'height', 'margin')
+
+    def __init__(self, name: str, x, y, width: Fraction, height: Fraction, margin: bool = True):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.margin = margin
+
+    @staticmethod
+    def _place(start: int, size: int, position, fraction: Fraction) -> Tuple[int, int]:
+        length = int(size * fraction)
+        if position == CENTER:
+            return start + (size - length) // 2, length
+        return start + int(size * position), length
+
+    def rect(self, workarea: Rect, margin: int) -> Rect:
+        area_x, area_y, area_width, area_height = workarea
+        x, width = self._place(area_x, area_width, self.x, self.width)
+        y, height = self._place(area_y, area_height, self.y, self.height)
+        if self.margin:
+            return x + margin, y + margin, width - margin * 2, height - margin * 2
+        return x, y, width, height
+
+
+def compile_layout(name: str, spec: Dict) -> Layout:
+    if not isinstance(spec, dict):
+        raise ValueError(f"Layout {name!r} must be an object")
+    unknown = set(spec) - {'x', 'y', 'width', 'height', 'margin'}
+    if unknown:
+        raise ValueError(f"Layout {name!r} has unknown keys: {', '.join(sorted(unknown))}")
+    position = []
+    for key in ('x', 'y'):
+        value = spec.get(key, 0)
+        position.append(value if value == CENTER else parse_fraction(value, f"{name}.{key}"))
+    size = []
+    for key in ('width', 'height'):
+        if key not in spec:
+            raise ValueError(f"Layout {name!r} is missing {key}")
+        fraction = parse_fraction(spec[key], f"{name}.{key}")
+        if not fraction:
+            raise ValueError(f"Layout {name!r} {key} must not be zero")
+        size.append(fraction)
+    for key, size_key, start, length in (('x', 'width', position[0], size[0]),
+                                         ('y', 'height', position[1], size[1])):
+        if start != CENTER and start + length > 1:
+            raise ValueError(f"Layout {name!r} does not fit the workarea: "
+                             f"{key} + {size_key} is {start + length}, more than 1")
+    margin = spec.get('margin', True)
+    if not isinstance(margin, bool):
+        raise ValueError(f"Layout {name!r} margin must be true or false")
+    return Layout(name, position[0], position[1], size[0], size[1], margin)
+
+
+def compile_layouts(overrides: Optional[Dict] = None) -> Dict[str, Layout]:
+    """Default layouts merged with the config ones, null removes a layout"""
+    specs = dict(DEFAULT_LAYOUTS)
+    if overrides:
+        if not isinstance(overrides, dict):
+            raise ValueError("layouts must be an object")
+        specs.update(overrides)
+    return {name: compile_layout(name, spec) for name, spec in specs.items() if spec is not None}
+
+
+class LayoutEngine:
+    """Pixel rects of every layout, computed once per workarea and margin.
+
+    Applying an action is a dict lookup. Tables stay valid until the
+    monitors change; a new config builds a new engine.
+    """
+
+    def __init__(self, layouts: Dict[str, Layout]):
+        self.layouts = layouts
+        self._tables: Dict[Tuple[Rect, int], Dict[str, Rect]] = {}
+
+    @property
+    def names(self):
+        return list(self.layouts)
+
+    def rect_for(self, name: str, workarea: Rect, margin: int) -> Optional[Rect]:
+        key = (tuple(workarea), margin)
+        table = self._tables.get(key)
+        if table is None:
+            table = {layout_name: layout.rect(key[0], margin)
+                     for layout_name, layout in self.layouts.items()}
+            self._tables[key] = table
+        return table.get(name)
+
+    def invalidate(self, *args):
+        self._tables = {}
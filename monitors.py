@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+from bisect import bisect_right
+from typing import Callable, List, Optional, Tuple
+
+Rect = Tuple[int, int, int, int]
+
+
+class Monitor:
+    __slots__ = ('name', 'x', 'y', 'width', 'height', 'workarea', 'primary')
+
+    def __init__(self, name: str, x: int, y: int, width: int, height: int,
+                 workarea: Optional[Rect] = None, primary: bool = False):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.workarea = workarea or (x, y, width, height)
+        self.primary = primary
+
+    @property
+    def geometry(self) -> Rect:
+        return self.x, self.y, self.width, self.height
+
+    def __eq__(self, other):
+        return (isinstance(other, Monitor) and self.name == other.name
+                and self.geometry == other.geometry and self.workarea == other.workarea
+                and self.primary == other.primary)
+
+    def __hash__(self):
+        return hash((self.name, self.geometry))
+
+    def __repr__(self):
+        return f"Monitor({self.name!r}, {self.x}, {self.y}, {self.width}x{self.height})"
+
+
+class MonitorRegistry:
+    """Per-output geometry, refreshed only when the display layout changes.
+
+    Point lookups go through a precomputed column/row table so finding the
+    monitor under a window or the pointer is two bisections.
+    """
+
+    def __init__(self):
+        self.monitors: List[Monitor] = []
+        self.primary: Optional[Monitor] = None
+        # (column edges, per column (row edges, monitors)), replaced as a
+        # whole so the action worker never sees columns and rows out of step
+        self._lookup: Tuple[List[int], List[Tuple[List[int], List[Optional[Monitor]]]]] = ([], [])
+        self._listeners: List[Callable] = []
+
+    def connect(self, callback: Callable):
+        """Call callback(registry) whenever the monitor layout changes"""
+        self._listeners.append(callback)
+
+    def disconnect(self, callback: Callable):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def update(self, monitors: List[Monitor]):
+        if monitors == self.monitors:
+            return
+        self.monitors = list(monitors)
+        self.primary = next((m for m in self.monitors if m.primary),
+                            self.monitors[0] if self.monitors else None)
+        self._build_lookup()
+        for callback in list(self._listeners):
+            callback(self)
+
+    def _build_lookup(self):
+        columns = sorted({m.x for m in self.monitors} | {m.x + m.width for m in self.monitors})
+        rows = []
+        for left in columns:
+            in_column = [m for m in self.monitors if m.x <= left < m.x + m.width]
+            edges = sorted({m.y for m in in_column} | {m.y + m.height for m in in_column})
+            cells = []
+            for top in edges:
+                cells.append(next((m for m in in_column if m.y <= top < m.y + m.height), None))
+            rows.append((edges, cells))
+        self._lookup = (columns, rows)
+
+    def monitor_at(self, x: int, y: int) -> Optional[Monitor]:
+        columns, rows = self._lookup
+        column = bisect_right(columns, x) - 1
+        if column < 0:
+            return None
+        edges, cells = rows[column]
+        row = bisect_right(edges, y) - 1
+        if row < 0:
+            return None
+        return cells[row]
+
+    def monitor_for_rect(self, x: int, y: int, width: int, height: int) -> Optional[Monitor]:
+        """Monitor containing the center of the rectangle, primary if none"""
+        return self.monitor_at(x + width // 2, y + height // 2) or self.primary
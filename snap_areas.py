@@ -2,7 +2,7 @@
 
 import gi
 import time
-from typing import Tuple, Optional, Dict
+from typing import Callable, Tuple, Optional, Dict, List
 
 gi.require_version('Gtk', '3.0')
 gi.require_version('Gdk', '3.0')
@@ -10,120 +10,404 @@ gi.require_version('Gdk', '3.0')
 from gi.repository import Gtk, Gdk, GLib, cairo
 
 
+# Side of a grid cell in the hit-test index
+GRID_CELL_SIZE = 64
+# Pointer polling period while a window is being dragged, in ms
+POINTER_POLL_INTERVAL = 16
+BORDER_WIDTH = 2
+
+
 class SnapArea:
-    def __init__(self, x: int, y: int, width: int, height: int, action: str):
+    def __init__(self, x: int, y: int, width: int, height: int, action: str,
+                 priority: Optional[int] = None):
         self.x = x
         self.y = y
         self.width = width
         self.height = height
         self.action = action
         self.active = False
+        # Corners and thirds win over the plain edges they overlap
+        if priority is None:
+            priority = 1 if action.startswith(('quarter_', 'third_')) else 0
+        self.priority = priority
+        self.color = area_color(action)
 
+    def damage_rect(self) -> Tuple[int, int, int, int]:
+        """Pixels touched when drawing the area, including the border"""
+        pad = BORDER_WIDTH
+        return self.x - pad, self.y - pad, self.width + 2 * pad, self.height + 2 * pad
+
+
+def area_color(action: str) -> Tuple[float, float, float, float]:
+    if action.startswith('quarter_'):
+        return (0.2, 0.6, 1.0, 0.3)  # Blue for quarters
+    if action.startswith('third_'):
+        return (0.8, 0.4, 0.2, 0.3)  # Orange for thirds
+    if action == 'maximize':
+        return (0.2, 0.8, 0.2, 0.3)  # Green for maximize
+    return (0.6, 0.2, 0.8, 0.3)  # Purple for halves
+
+
+def draw_snap_area(cr, area: SnapArea):
+    # Draw filled rectangle for snap area preview
+    cr.set_source_rgba(*area.color)
+    cr.rectangle(area.x, area.y, area.width, area.height)
+    cr.fill()
+
+    # Draw border
+    cr.set_source_rgba(1.0, 1.0, 1.0, 0.8)
+    cr.set_line_width(BORDER_WIDTH)
+    cr.rectangle(area.x, area.y, area.width, area.height)
+    cr.stroke()
+
+
+def intersects(area: SnapArea, extents: Tuple[float, float, float, float]) -> bool:
+    x1, y1, x2, y2 = extents
+    x, y, width, height = area.damage_rect()
+    return x < x2 and y < y2 and x + width > x1 and y + height > y1
+
+
+class SnapZoneIndex:
+    """Coarse grid over the snap areas for constant time hit tests.
+
+    Each cell lists the areas overlapping it, highest priority first and
+    in definition order otherwise, so the first area containing the point
+    is the answer.
+    """
+
+    def __init__(self, areas: Dict[str, SnapArea], x: int, y: int, width: int, height: int,
+                 cell_size: int = GRID_CELL_SIZE):
+        self.areas = areas
+        self.cell_size = cell_size
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        # Bounds are inclusive, the far edge needs its own column and row
+        self.columns = width // cell_size + 1
+        self.rows = height // cell_size + 1
+        cells: List[List[Tuple[str, SnapArea]]] = [[] for _ in range(self.columns * self.rows)]
+
+        ordered = sorted(areas.items(), key=lambda item: -item[1].priority)
+        for name, area in ordered:
+            first_col, last_col = self._span(area.x - x, area.width, self.columns)
+            first_row, last_row = self._span(area.y - y, area.height, self.rows)
+            for row in range(first_row, last_row + 1):
+                offset = row * self.columns
+                for col in range(first_col, last_col + 1):
+                    cells[offset + col].append((name, area))
+        self.cells = [tuple(cell) for cell in cells]
+
+    def _span(self, start: int, length: int, count: int) -> Tuple[int, int]:
+        first = max(0, start // self.cell_size)
+        last = min(count - 1, (start + length) // self.cell_size)
+        return first, last
+
+    def hit_test(self, x: int, y: int) -> Optional[str]:
+        local_x = x - self.x
+        local_y = y - self.y
+        if not (0 <= local_x <= self.width and 0 <= local_y <= self.height):
+            return None
+        cell = self.cells[(local_y // self.cell_size) * self.columns + local_x // self.cell_size]
+        for name, area in cell:
+            if area.x <= x <= area.x + area.width and area.y <= y <= area.y + area.height:
+                return name
+        return None
+
+
+# Built-in zones and their default actions
+DEFAULT_ZONE_ACTIONS = {
+    # Edge areas
+    'left_edge': 'snap_left',
+    'right_edge': 'snap_right',
+    'top_edge': 'maximize',
+    'bottom_edge': 'center',
+    # Corner areas
+    'top_left': 'quarter_top_left',
+    'top_right': 'quarter_top_right',
+    'bottom_left': 'quarter_bottom_left',
+    'bottom_right': 'quarter_bottom_right',
+    # Third areas (when dragging to edges)
+    'left_third': 'third_left',
+    'right_third': 'third_right',
+}
+DEFAULT_CORNER_SIZE = 100
+# Custom zones win over the built-in ones they overlap
+CUSTOM_ZONE_PRIORITY = 2
+
+
+def _resolve(value, size: int) -> int:
+    """Floats are fractions of the monitor, negative pixels count from the far side"""
+    if isinstance(value, float):
+        return int(round(value * size))
+    return size + value if value < 0 else value
+
+
+class SnapZoneSpec:
+    """A validated zone layout, turned into snap areas for any monitor"""
+
+    def __init__(self, edge_width: int = 20, corner_size: int = DEFAULT_CORNER_SIZE,
+                 actions: Optional[Dict[str, Optional[str]]] = None, custom: tuple = ()):
+        self.edge_width = edge_width
+        self.corner_size = corner_size
+        self.actions = dict(DEFAULT_ZONE_ACTIONS, **(actions or {}))
+        # (x, y, width, height, action, priority) per custom zone
+        self.custom = tuple(custom)
+
+    def create_areas(self, x: int, y: int, width: int, height: int) -> Dict[str, SnapArea]:
+        edge = self.edge_width
+        corner = self.corner_size
+        right = x + width
+        bottom = y + height
+        rects = {
+            'left_edge': (x, y, edge, height),
+            'right_edge': (right - edge, y, edge, height),
+            'top_edge': (x, y, width, edge),
+            'bottom_edge': (x, bottom - edge, width, edge),
+            'top_left': (x, y, corner, corner),
+            'top_right': (right - corner, y, corner, corner),
+            'bottom_left': (x, bottom - corner, corner, corner),
+            'bottom_right': (right - corner, bottom - corner, corner, corner),
+            'left_third': (x, y + edge, edge, height - 2 * edge),
+            'right_third': (right - edge, y + edge, edge, height - 2 * edge),
+        }
+        areas = {name: SnapArea(*rects[name], action)
+                 for name, action in self.actions.items() if action}
+        for i, (zone_x, zone_y, zone_width, zone_height, action, priority) in enumerate(self.custom):
+            areas[f'custom_{i}'] = SnapArea(x + _resolve(zone_x, width), y + _resolve(zone_y, height),
+                                            _resolve(zone_width, width), _resolve(zone_height, height),
+                                            action, priority)
+        return areas
+
+
+def _check_number(value, name: str, allow_negative: bool = False):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    if isinstance(value, float) and not 0.0 <= value <= 1.0:
+        raise ValueError(f"{name} fraction must be between 0.0 and 1.0, got {value}")
+    if isinstance(value, int) and value < 0 and not allow_negative:
+        raise ValueError(f"{name} must not be negative, got {value}")
+
+
+def compile_zone_spec(spec: Dict, edge_width: int, valid_actions) -> SnapZoneSpec:
+    """Validate the snap_zones config section, raises ValueError if it is unusable.
+
+    Keys: corner_size (pixels), zones (built-in zone name -> action, or
+    null to disable it) and custom, a list of {x, y, width, height,
+    action, priority} where floats are fractions of the monitor and
+    negative x/y pixels count from the right/bottom.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("snap_zones must be an object")
+    unknown = set(spec) - {'corner_size', 'zones', 'custom'}
+    if unknown:
+        raise ValueError(f"Unknown snap_zones keys: {', '.join(sorted(unknown))}")
+    if isinstance(edge_width, bool) or not isinstance(edge_width, int) or edge_width <= 0:
+        raise ValueError(f"snap_threshold must be a positive integer, got {edge_width!r}")
+
+    corner_size = spec.get('corner_size', DEFAULT_CORNER_SIZE)
+    if isinstance(corner_size, bool) or not isinstance(corner_size, int) or corner_size < edge_width:
+        raise ValueError(f"corner_size must be an integer of at least snap_threshold, got {corner_size!r}")
+
+    actions = spec.get('zones', {})
+    if not isinstance(actions, dict):
+        raise ValueError("snap_zones.zones must be an object")
+    for name, action in actions.items():
+        if name not in DEFAULT_ZONE_ACTIONS:
+            raise ValueError(f"Unknown snap zone {name!r}")
+        if action is not None and action not in valid_actions:
+            raise ValueError(f"Unknown action {action!r} for snap zone {name!r}")
+
+    custom = []
+    zones = spec.get('custom', [])
+    if not isinstance(zones, list):
+        raise ValueError("snap_zones.custom must be a list")
+    for i, zone in enumerate(zones):
+        if not isinstance(zone, dict):
+            raise ValueError(f"Custom snap zone {i} must be an object")
+        missing = {'x', 'y', 'width', 'height', 'action'} - set(zone)
+        if missing:
+            raise ValueError(f"Custom snap zone {i} is missing {', '.join(sorted(missing))}")
+        for key in ('x', 'y'):
+            _check_number(zone[key], f"Custom snap zone {i} {key}", allow_negative=True)
+        for key in ('width', 'height'):
+            _check_number(zone[key], f"Custom snap zone {i} {key}")
+            if not zone[key]:
+                raise ValueError(f"Custom snap zone {i} {key} must not be zero")
+        if zone['action'] not in valid_actions:
+            raise ValueError(f"Unknown action {zone['action']!r} for custom snap zone {i}")
+        priority = zone.get('priority', CUSTOM_ZONE_PRIORITY)
+        if isinstance(priority, bool) or not isinstance(priority, int):
+            raise ValueError(f"Custom snap zone {i} priority must be an integer")
+        custom.append((zone['x'], zone['y'], zone['width'], zone['height'], zone['action'], priority))
+
+    # Built-in zones whose default action is gone (a removed layout) are disabled
+    zone_actions = {name: action if action in valid_actions else None
+                    for name, action in DEFAULT_ZONE_ACTIONS.items()}
+    zone_actions.update(actions)
+    return SnapZoneSpec(edge_width, corner_size, zone_actions, custom)
+
+
+DEFAULT_ZONE_SPEC = SnapZoneSpec()
+
+
+# Side of a cell in the pointer -> monitor routing grid
+ROUTE_CELL_SIZE = 256
+
+
+class SnapZoneMap:
+    """Snap zones for every monitor, so inner monitor edges snap too.
+
+    Each monitor has its own SnapZoneIndex, kept across hotplugs while its
+    geometry is unchanged. A coarse routing grid over the whole desktop
+    sends a pointer position to its monitor's index in constant time.
+    Area names are "<monitor>/<area>".
+    """
+
+    def __init__(self, spec: SnapZoneSpec = DEFAULT_ZONE_SPEC):
+        self.spec = spec
+        self._zones: Dict[str, Tuple[object, SnapZoneIndex]] = {}
+        self.snap_areas: Dict[str, SnapArea] = {}
+        self.bounds = (0, 0, 0, 0)
+        self._route_columns = 0
+        self._routes: List[Tuple[Tuple[object, SnapZoneIndex], ...]] = []
+
+    def update(self, monitors) -> List[str]:
+        """Rebuild the zones of added or changed monitors, returns their names"""
+        current = {}
+        for monitor in monitors:
+            # Zones are keyed by name, a repeated name must not drop a monitor
+            name = monitor.name
+            suffix = 1
+            while name in current:
+                suffix += 1
+                name = f'{monitor.name}#{suffix}'
+            current[name] = monitor
+        changed = [name for name, (monitor, index) in self._zones.items()
+                   if current.get(name) != monitor]
+        for name in changed:
+            del self._zones[name]
+        for name, monitor in current.items():
+            if name not in self._zones:
+                areas = self.spec.create_areas(*monitor.geometry)
+                areas = {f'{name}/{area_name}': area for area_name, area in areas.items()}
+                self._zones[name] = (monitor, SnapZoneIndex(areas, *monitor.geometry))
+                if name not in changed:
+                    changed.append(name)
+        if changed:
+            self.snap_areas = {}
+            for monitor, index in self._zones.values():
+                self.snap_areas.update(index.areas)
+            self._build_routes()
+        return changed
+
+    def set_spec(self, spec: SnapZoneSpec):
+        """Use a new layout, every monitor is rebuilt on the next update()"""
+        self.spec = spec
+        self._zones = {}
+
+    def _build_routes(self):
+        zones = list(self._zones.values())
+        if not zones:
+            self.bounds = (0, 0, 0, 0)
+            self._route_columns = 0
+            self._routes = []
+            return
+        left = min(monitor.x for monitor, index in zones)
+        top = min(monitor.y for monitor, index in zones)
+        right = max(monitor.x + monitor.width for monitor, index in zones)
+        bottom = max(monitor.y + monitor.height for monitor, index in zones)
+        self.bounds = (left, top, right - left, bottom - top)
+        self._route_columns = (right - left) // ROUTE_CELL_SIZE + 1
+        rows = (bottom - top) // ROUTE_CELL_SIZE + 1
+        routes = [[] for _ in range(self._route_columns * rows)]
+        for zone in zones:
+            monitor = zone[0]
+            first_col = (monitor.x - left) // ROUTE_CELL_SIZE
+            last_col = (monitor.x + monitor.width - left) // ROUTE_CELL_SIZE
+            first_row = (monitor.y - top) // ROUTE_CELL_SIZE
+            last_row = (monitor.y + monitor.height - top) // ROUTE_CELL_SIZE
+            for row in range(first_row, last_row + 1):
+                for col in range(first_col, last_col + 1):
+                    routes[row * self._route_columns + col].append(zone)
+        self._routes = [tuple(route) for route in routes]
+
+    def monitor_of(self, name: Optional[str]):
+        """Monitor an area name belongs to, None if it is gone"""
+        zone = self._zones.get(name.split('/', 1)[0]) if name else None
+        return zone[0] if zone else None
+
+    def hit_test(self, x: int, y: int) -> Optional[str]:
+        left, top, width, height = self.bounds
+        local_x = x - left
+        local_y = y - top
+        if not (0 <= local_x <= width and 0 <= local_y <= height):
+            return None
+        route = self._routes[(local_y // ROUTE_CELL_SIZE) * self._route_columns
+                             + local_x // ROUTE_CELL_SIZE]
+        for monitor, index in route:
+            # Monitors share their boundary, the one the pointer is inside wins
+            if monitor.x <= x < monitor.x + monitor.width and monitor.y <= y < monitor.y + monitor.height:
+                return index.hit_test(x, y)
+        for monitor, index in route:
+            name = index.hit_test(x, y)
+            if name:
+                return name
+        return None
+
+
+class _SnapWindow(Gtk.Window):
+    """Hit testing and painting shared by the drag snap windows.
+
+    Subclasses provide draw_area(cr, area) for the hovered area and may
+    react to hover changes in area_changed().
+    """
+    # True if sized to the desktop, then it is rebuilt when the bounds change
+    covers_desktop = False
+
+    def __init__(self, zones: SnapZoneMap, **kwargs):
+        super().__init__(**kwargs)
+
+        self.zones = zones
+        self.current_area = None
 
-class SnapOverlay(Gtk.Window):
-    def __init__(self, screen_width: int, screen_height: int):
-        super().__init__()
-        
-        self.screen_width = screen_width
-        self.screen_height = screen_height
-        
-        # Configure window properties
         self.set_app_paintable(True)
-        self.set_decorated(False)
-        self.set_skip_taskbar_hint(True)
-        self.set_skip_pager_hint(True)
-        self.set_keep_above(True)
         self.set_accept_focus(False)
-        self.set_can_focus(False)
-        
+
         # Make window transparent
         screen = self.get_screen()
         visual = screen.get_rgba_visual()
         if visual:
             self.set_visual(visual)
-        
-        # Set window size to cover entire screen
-        self.set_size_request(screen_width, screen_height)
-        self.move(0, 0)
-        
+
         self.connect('draw', self.on_draw)
-        
-        self.snap_areas = self._create_snap_areas()
-        self.current_area = None
-        
-    def _create_snap_areas(self) -> Dict[str, SnapArea]:
-        edge_width = 20  # Width of edge snap areas
-        corner_size = 100  # Size of corner areas
-        
-        return {
-            # Edge areas
-            'left_edge': SnapArea(0, 0, edge_width, self.screen_height, 'snap_left'),
-            'right_edge': SnapArea(self.screen_width - edge_width, 0, edge_width, self.screen_height, 'snap_right'),
-            'top_edge': SnapArea(0, 0, self.screen_width, edge_width, 'maximize'),
-            'bottom_edge': SnapArea(0, self.screen_height - edge_width, self.screen_width, edge_width, 'center'),
-            
-            # Corner areas
-            'top_left': SnapArea(0, 0, corner_size, corner_size, 'quarter_top_left'),
-            'top_right': SnapArea(self.screen_width - corner_size, 0, corner_size, corner_size, 'quarter_top_right'),
-            'bottom_left': SnapArea(0, self.screen_height - corner_size, corner_size, corner_size, 'quarter_bottom_left'),
-            'bottom_right': SnapArea(self.screen_width - corner_size, self.screen_height - corner_size, corner_size, corner_size, 'quarter_bottom_right'),
-            
-            # Third areas (when dragging to edges)
-            'left_third': SnapArea(0, edge_width, edge_width, self.screen_height - 2*edge_width, 'third_left'),
-            'right_third': SnapArea(self.screen_width - edge_width, edge_width, edge_width, self.screen_height - 2*edge_width, 'third_right'),
-        }
+
+    @property
+    def snap_areas(self) -> Dict[str, SnapArea]:
+        return self.zones.snap_areas
 
     def on_draw(self, widget, cr):
-        # Clear the surface
+        # GTK clips cr to the damaged region, only that part is cleared
         cr.set_source_rgba(0, 0, 0, 0)
         cr.set_operator(cairo.OPERATOR_SOURCE)
         cr.paint()
-        
-        # Draw active snap areas
+
         if self.current_area:
-            area = self.snap_areas[self.current_area]
-            
-            # Set color based on action type
-            if 'quarter' in area.action:
-                cr.set_source_rgba(0.2, 0.6, 1.0, 0.3)  # Blue for quarters
-            elif 'third' in area.action:
-                cr.set_source_rgba(0.8, 0.4, 0.2, 0.3)  # Orange for thirds
-            elif area.action == 'maximize':
-                cr.set_source_rgba(0.2, 0.8, 0.2, 0.3)  # Green for maximize
-            else:
-                cr.set_source_rgba(0.6, 0.2, 0.8, 0.3)  # Purple for halves
-            
-            # Draw filled rectangle for snap area preview
-            cr.rectangle(area.x, area.y, area.width, area.height)
-            cr.fill()
-            
-            # Draw border
-            cr.set_source_rgba(1.0, 1.0, 1.0, 0.8)
-            cr.set_line_width(2)
-            cr.rectangle(area.x, area.y, area.width, area.height)
-            cr.stroke()
-        
+            self.draw_area(cr, self.snap_areas[self.current_area])
+
         return False
 
     def update_mouse_position(self, x: int, y: int) -> Optional[str]:
-        new_area = None
-        
-        # Check which area the mouse is in (prioritize corners over edges)
-        for area_name, area in self.snap_areas.items():
-            if (area.x <= x <= area.x + area.width and 
-                area.y <= y <= area.y + area.height):
-                if 'quarter' in area.action or 'third' in area.action:
-                    new_area = area_name
-                    break
-                elif new_area is None:
-                    new_area = area_name
-        
+        new_area = self.zones.hit_test(int(x), int(y))
         if new_area != self.current_area:
+            previous = self.current_area
             self.current_area = new_area
-            self.queue_draw()
-            
+            self.area_changed(previous, new_area)
         return new_area
 
+    def area_changed(self, previous: Optional[str], current: Optional[str]):
+        pass
+
     def get_current_action(self) -> Optional[str]:
         if self.current_area:
             return self.snap_areas[self.current_area].action
@@ -137,24 +421,175 @@ class SnapOverlay(Gtk.Window):
         self.show_all()
 
 
+class SnapOverlay(_SnapWindow):
+    covers_desktop = True
+
+    def __init__(self, zones: SnapZoneMap):
+        super().__init__(zones)
+        self.origin_x, self.origin_y, width, height = zones.bounds
+        
+        # Configure window properties
+        self.set_decorated(False)
+        self.set_skip_taskbar_hint(True)
+        self.set_skip_pager_hint(True)
+        self.set_keep_above(True)
+        self.set_can_focus(False)
+        
+        # Set window size to cover every monitor
+        self.set_size_request(width, height)
+        self.move(self.origin_x, self.origin_y)
+
+    def draw_area(self, cr, area: SnapArea):
+        # Areas are in desktop coordinates
+        cr.translate(-self.origin_x, -self.origin_y)
+        if intersects(area, cr.clip_extents()):
+            draw_snap_area(cr, area)
+
+    def area_changed(self, previous: Optional[str], current: Optional[str]):
+        # Repaint only where the old and the new highlight are
+        for name in (previous, current):
+            if name:
+                x, y, width, height = self.snap_areas[name].damage_rect()
+                self.queue_draw_area(x - self.origin_x, y - self.origin_y, width, height)
+
+
+class SnapPreview(_SnapWindow):
+    """Window covering only the target geometry of the hovered snap area.
+
+    The compositor blends one target-sized rectangle instead of a full
+    screen of transparent pixels, and the user sees exactly where the
+    window will land. It is kept between drags and just moved, and is
+    only mapped while there is a target.
+    """
+
+    def __init__(self, zones: SnapZoneMap,
+                 geometry_provider: Callable[..., Optional[Tuple[int, int, int, int]]]):
+        # A popup is placed exactly where asked and never takes focus
+        super().__init__(zones, type=Gtk.WindowType.POPUP)
+        self.geometry_provider = geometry_provider
+
+    def draw_area(self, cr, area: SnapArea):
+        width, height = self.get_size()
+        cr.set_source_rgba(*area.color)
+        cr.rectangle(0, 0, width, height)
+        cr.fill()
+
+        cr.set_source_rgba(1.0, 1.0, 1.0, 0.8)
+        cr.set_line_width(BORDER_WIDTH)
+        inset = BORDER_WIDTH / 2
+        cr.rectangle(inset, inset, width - BORDER_WIDTH, height - BORDER_WIDTH)
+        cr.stroke()
+
+    def area_changed(self, previous: Optional[str], current: Optional[str]):
+        geometry = None
+        if current:
+            # The target is on the hovered zone's monitor, not the window's
+            geometry = self.geometry_provider(self.snap_areas[current].action,
+                                              self.zones.monitor_of(current))
+        if geometry:
+            x, y, width, height = geometry
+            self.move(x, y)
+            self.resize(max(1, width), max(1, height))
+            self.show()
+            self.queue_draw()
+        else:
+            self.hide()
+
+    def show_overlay(self):
+        # Mapped once the pointer is over a zone with a target
+        pass
+
+
 class DragSnapManager:
-    def __init__(self, window_manager, action_callbacks):
+    def __init__(self, window_manager, action_callbacks, preview_mode: str = 'overlay',
+                 geometry_provider: Optional[Callable] = None,
+                 zone_spec: SnapZoneSpec = DEFAULT_ZONE_SPEC):
         self.window_manager = window_manager
         self.action_callbacks = action_callbacks
+        # 'window' shows the target geometry, 'overlay' the snap zones
+        self.preview_mode = preview_mode
+        self.geometry_provider = geometry_provider
         self.overlay = None
         self.is_dragging = False
         self.drag_window = None
         self.drag_start_time = 0
+        # Latest pointer position from the listener thread, consumed once per frame
+        self._pointer = None
+        self._last_pointer = None
+        self._tick_id = None
+        self._timer_id = None
+        self._poll_id = None
+        self.mouse_listener = None
+        self._screen_handler = None
+        self._watched_window = None
+        self._geometry_handler = None
+        self._watched_size = None
+        self._zones_stale = False
+        self._show_requested = None
+        self._closed = False
+        self.stats = {'drags': 0, 'motion_events': 0, 'hit_tests': 0,
+                      'first_paints': 0, 'first_paint_total': 0.0, 'first_paint_max': 0.0}
         
-        # Get screen dimensions
-        screen_x, screen_y, screen_width, screen_height = window_manager.get_screen_geometry()
-        self.screen_width = screen_width
-        self.screen_height = screen_height
+        # Snap zones for every monitor, updated incrementally on hotplug
+        self.zones = SnapZoneMap(zone_spec)
+        self._pending_spec = None
+        self.zones.update(window_manager.monitors.monitors)
+
+        # Build and realize the overlay while idle, not on the first drag
+        window_manager.monitors.connect(self._on_monitors_changed)
+        GLib.idle_add(self._prewarm)
         
-        # Set up mouse tracking
-        self._setup_mouse_tracking()
+        # Detect drags from window manager events where possible
+        if window_manager.screen and window_manager.display:
+            self._setup_drag_detection()
+        else:
+            self._setup_mouse_tracking()
+
+    def _setup_drag_detection(self):
+        # Only the active window can be dragged, so only it is watched. The
+        # pointer is polled while its move lasts, clicks cost nothing.
+        screen = self.window_manager.screen
+        self._screen_handler = screen.connect('active-window-changed', self._on_active_window_changed)
+        self._watch_window(screen.get_active_window())
+
+    def _watch_window(self, window):
+        if self._watched_window is not None:
+            self._watched_window.disconnect(self._geometry_handler)
+        self._watched_window = window
+        self._geometry_handler = None
+        self._watched_size = None
+        if window is not None:
+            self._watched_size = tuple(window.get_geometry())[2:]
+            self._geometry_handler = window.connect('geometry-changed', self._on_geometry_changed)
+
+    def _on_active_window_changed(self, screen, previous):
+        self._watch_window(screen.get_active_window())
+
+    def _on_geometry_changed(self, window):
+        size = tuple(window.get_geometry())[2:]
+        moved = size == self._watched_size
+        self._watched_size = size
+        # Resizes and our own snaps also change the geometry, a move with
+        # the left button held is a drag
+        if self.is_dragging or not moved:
+            return
+        pointer = self.window_manager.query_pointer()
+        if pointer and pointer[2]:
+            self._start_drag(pointer[0], pointer[1], window)
+            self._poll_id = GLib.timeout_add(POINTER_POLL_INTERVAL, self._poll_pointer)
+
+    def _poll_pointer(self):
+        x, y, pressed = self.window_manager.query_pointer()
+        if not pressed:
+            self._poll_id = None
+            self._end_drag(x, y)
+            return False
+        self._pointer = (x, y)
+        self.stats['motion_events'] += 1
+        return True
 
     def _setup_mouse_tracking(self):
+        # Fallback without Wnck and Xlib, a global listener for the whole session
         try:
             from pynput.mouse import Listener as MouseListener
             
@@ -167,59 +602,203 @@ class DragSnapManager:
             print(f"Failed to set up mouse tracking: {e}")
 
     def _on_mouse_move(self, x, y):
-        if self.is_dragging and self.overlay:
-            area = self.overlay.update_mouse_position(x, y)
+        # Listener thread: only remember where the pointer is, the overlay is
+        # updated from its frame clock however fast the mouse reports
+        if self.is_dragging:
+            self._pointer = (x, y)
+            self.stats['motion_events'] += 1
 
     def _on_mouse_click(self, x, y, button, pressed):
         from pynput.mouse import Button
         
         if button == Button.left:
+            # GTK and the window manager are only touched from the main loop
             if pressed:
-                self._start_drag(x, y)
+                GLib.idle_add(self._on_button_pressed, x, y)
             else:
-                self._end_drag(x, y)
+                GLib.idle_add(self._end_drag, x, y)
+
+    def _on_button_pressed(self, x, y):
+        # Use the cached focus, a click must not cost a compositor round trip
+        window_key = self.window_manager.get_active_window_key()
+        if window_key is not None:
+            self._start_drag(x, y, window_key)
+        return False
 
-    def _start_drag(self, x, y):
-        # Check if we're dragging a window
-        active_window = self.window_manager.get_active_window()
-        if active_window:
+    def _start_drag(self, x, y, window):
+        if window:
             self.is_dragging = True
-            self.drag_window = active_window
+            self.drag_window = window
+            self.stats['drags'] += 1
             self.drag_start_time = time.time()
+            self._pointer = (x, y)
+            self._last_pointer = None
             
             # Create and show overlay after a brief delay to avoid accidental triggers
             GLib.timeout_add(200, self._show_overlay_delayed)
 
-    def _show_overlay_delayed(self):
+    def _prewarm(self):
+        if self.overlay is None and not self._closed:
+            self.overlay = self._create_overlay()
+            self.overlay.connect_after('draw', self._on_overlay_draw)
+            self.overlay.realize()
+        return False
+
+    def _on_monitors_changed(self, registry):
         if self.is_dragging:
-            if not self.overlay:
-                self.overlay = SnapOverlay(self.screen_width, self.screen_height)
+            # Swap the zones once the current drag is over
+            self._zones_stale = True
+        else:
+            self._apply_monitor_change()
+
+    def set_zone_spec(self, spec: SnapZoneSpec):
+        self._pending_spec = spec
+        self._on_monitors_changed(self.window_manager.monitors)
+
+    def _apply_monitor_change(self):
+        self._zones_stale = False
+        if self._pending_spec is not None:
+            self.zones.set_spec(self._pending_spec)
+            self._pending_spec = None
+        bounds = self.zones.bounds
+        if self.zones.update(self.window_manager.monitors.monitors) and \
+                self.overlay is not None and self.overlay.covers_desktop and \
+                self.zones.bounds != bounds:
+            # The full-screen overlay has to cover the new desktop size
+            GLib.idle_add(self._rebuild_overlay)
+
+    def _rebuild_overlay(self):
+        if self.overlay:
+            self.overlay.destroy()
+            self.overlay = None
+        return self._prewarm()
+
+    def _on_overlay_draw(self, widget, cr):
+        if self._show_requested is not None:
+            latency = time.monotonic() - self._show_requested
+            self._show_requested = None
+            self.stats['first_paints'] += 1
+            self.stats['first_paint_total'] += latency
+            if latency > self.stats['first_paint_max']:
+                self.stats['first_paint_max'] = latency
+        return False
+
+    def _show_overlay_delayed(self):
+        if self.is_dragging and not self._closed:
+            self._prewarm()
+            if self.overlay is None:
+                return False
             self.overlay.show_overlay()
+            if self.overlay.get_visible():
+                self._show_requested = time.monotonic()
+            self._drive_hit_tests()
         return False  # Don't repeat
 
+    def _create_overlay(self):
+        if self.preview_mode == 'window' and self.geometry_provider:
+            return SnapPreview(self.zones, self.geometry_provider)
+        return SnapOverlay(self.zones)
+
+    def _drive_hit_tests(self):
+        # The frame clock only runs while the window is mapped, a preview
+        # without a target is hidden and falls back to a timer
+        if self.overlay.get_visible():
+            if self._tick_id is None:
+                self._tick_id = self.overlay.add_tick_callback(self._on_frame_tick)
+        elif self._timer_id is None:
+            self._timer_id = GLib.timeout_add(POINTER_POLL_INTERVAL, self._on_timer_tick)
+
+    def _on_frame_tick(self, widget, frame_clock):
+        self._process_pointer()
+        if self.overlay.get_visible():
+            return True
+        self._tick_id = None
+        self._drive_hit_tests()
+        return False
+
+    def _on_timer_tick(self):
+        self._process_pointer()
+        if self.is_dragging and not self.overlay.get_visible():
+            return True
+        self._timer_id = None
+        if self.is_dragging:
+            self._drive_hit_tests()
+        return False
+
+    def _process_pointer(self):
+        pointer = self._pointer
+        if pointer is None or pointer == self._last_pointer or not self.overlay:
+            return
+        self._last_pointer = pointer
+        visible = self.overlay.get_visible()
+        self.overlay.update_mouse_position(*pointer)
+        self.stats['hit_tests'] += 1
+        if not visible and self.overlay.get_visible():
+            # The preview maps itself on its first target, time that paint
+            self._show_requested = time.monotonic()
+
     def _end_drag(self, x, y):
         if not self.is_dragging:
-            return
+            return False
             
         self.is_dragging = False
+        if self._tick_id is not None:
+            self.overlay.remove_tick_callback(self._tick_id)
+            self._tick_id = None
+        if self._timer_id is not None:
+            GLib.source_remove(self._timer_id)
+            self._timer_id = None
         
         # Check if we dragged long enough and have an overlay
         drag_duration = time.time() - self.drag_start_time
         if drag_duration > 0.2 and self.overlay:
+            # The release position may not have been processed by a frame yet
+            self._pointer = (x, y)
+            self._process_pointer()
             action = self.overlay.get_current_action()
             
             if action and action in self.action_callbacks and self.drag_window:
-                # Execute the snap action
-                self.action_callbacks[action]()
+                # Snap onto the monitor of the zone that was hit
+                self.action_callbacks[action](self.zones.monitor_of(self.overlay.current_area))
         
         # Hide overlay
         if self.overlay:
             self.overlay.hide_overlay()
         
+        self._pointer = None
+        self._show_requested = None
         self.drag_window = None
+        if self._zones_stale:
+            self._apply_monitor_change()
+        return False
+
+    def get_stats(self) -> Dict[str, float]:
+        """Counters plus the time from showing the overlay to its first paint.
+
+        The paint latency is measured after the 200 ms drag debounce, which
+        is deliberate and the same for every drag.
+        """
+        stats = dict(self.stats)
+        total = stats.pop('first_paint_total')
+        stats['first_paint_avg_ms'] = total / (stats['first_paints'] or 1) * 1000
+        stats['first_paint_max_ms'] = stats.pop('first_paint_max') * 1000
+        return stats
 
     def cleanup(self):
-        if hasattr(self, 'mouse_listener'):
+        self._closed = True
+        if self.mouse_listener:
             self.mouse_listener.stop()
+        if self._poll_id is not None:
+            GLib.source_remove(self._poll_id)
+            self._poll_id = None
+        if self._timer_id is not None:
+            GLib.source_remove(self._timer_id)
+            self._timer_id = None
+        if self._screen_handler is not None:
+            self.window_manager.screen.disconnect(self._screen_handler)
+            self._screen_handler = None
+        self._watch_window(None)
+        self.window_manager.monitors.disconnect(self._on_monitors_changed)
         if self.overlay:
-            self.overlay.destroy()
\ No newline at end of file
+            self.overlay.destroy()
+            self.overlay = None
\ No newline at end of file
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import socket
+import struct
+import threading
+from typing import Any, List, Optional, Tuple
+
+# i3/sway IPC framing: magic string, payload length, message type
+IPC_MAGIC = b'i3-ipc'
+IPC_HEADER = struct.Struct('=6sII')
+
+# Message types
+RUN_COMMAND = 0
+GET_WORKSPACES = 1
+SUBSCRIBE = 2
+GET_OUTPUTS = 3
+GET_TREE = 4
+GET_VERSION = 7
+
+# Replies to events have the highest bit set
+EVENT_FLAG = 1 << 31
+
+# Event types (without EVENT_FLAG)
+EVENT_WORKSPACE = 0
+EVENT_OUTPUT = 1
+EVENT_WINDOW = 3
+
+
+class SwayIPCError(Exception):
+    pass
+
+
+class SwayIPC:
+    """Persistent connection to the sway IPC socket.
+
+    A single socket is kept open for the lifetime of the client and is
+    transparently re-opened if sway closes it (for example after a reload).
+    Requests are serialized with a lock so the client can be shared between
+    threads.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = 1.0):
+        self.socket_path = socket_path or os.environ.get('SWAYSOCK') or os.environ.get('I3SOCK')
+        self.timeout = timeout
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def connect(self):
+        if self._sock is not None:
+            return
+        if not self.socket_path:
+            raise SwayIPCError("SWAYSOCK is not set")
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise SwayIPCError(f"Cannot connect to {self.socket_path}: {e}")
+        self._sock = sock
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def fileno(self) -> int:
+        return self._sock.fileno() if self._sock is not None else -1
+
+    def _recv_exact(self, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            chunk = self._sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("sway IPC socket closed")
+            data += chunk
+        return bytes(data)
+
+    def _send_message(self, msg_type: int, payload: bytes):
+        self._sock.sendall(IPC_HEADER.pack(IPC_MAGIC, len(payload), msg_type) + payload)
+
+    def _read_message(self) -> Tuple[int, bytes]:
+        magic, length, msg_type = IPC_HEADER.unpack(self._recv_exact(IPC_HEADER.size))
+        if magic != IPC_MAGIC:
+            raise SwayIPCError("Invalid IPC magic in reply")
+        return msg_type, self._recv_exact(length)
+
+    def _roundtrip(self, msg_type: int, payload: bytes) -> bytes:
+        self.connect()
+        self._send_message(msg_type, payload)
+        while True:
+            reply_type, reply = self._read_message()
+            # Events are never sent on a non-subscribed socket, but skip
+            # them defensively so a reply is never mismatched.
+            if not reply_type & EVENT_FLAG:
+                return reply
+
+    def request(self, msg_type: int, payload: str = '') -> Any:
+        data = payload.encode('utf-8')
+        with self._lock:
+            try:
+                reply = self._roundtrip(msg_type, data)
+            except (OSError, ConnectionError):
+                # Stale connection, reconnect once and retry
+                self.close()
+                try:
+                    reply = self._roundtrip(msg_type, data)
+                except (OSError, ConnectionError) as e:
+                    self.close()
+                    raise SwayIPCError(f"sway IPC request failed: {e}")
+        try:
+            return json.loads(reply)
+        except ValueError as e:
+            raise SwayIPCError(f"Invalid sway IPC reply: {e}")
+
+    def subscribe(self, events: List[str]) -> bool:
+        reply = self.request(SUBSCRIBE, json.dumps(events))
+        return bool(reply.get('success', False))
+
+    def read_event(self) -> Tuple[int, Any]:
+        """Block until the next event arrives on a subscribed connection.
+
+        Only meant to be called from the single thread owning the
+        subscription, connection errors are left to the caller.
+        """
+        msg_type, payload = self._read_message()
+        return msg_type & ~EVENT_FLAG, json.loads(payload)
+
+    def command(self, command: str) -> list:
+        return self.request(RUN_COMMAND, command)
+
+    def get_tree(self) -> dict:
+        return self.request(GET_TREE)
+
+    def get_workspaces(self) -> list:
+        return self.request(GET_WORKSPACES)
+
+    def get_outputs(self) -> list:
+        return self.request(GET_OUTPUTS)
+
+
+class CommandBatch:
+    """Collects criteria-scoped sway commands and sends them as one message.
+
+    Commands are joined with ';' into a single RUN_COMMAND request, sway
+    replies with one result object per command in the same order.
+    """
+
+    def __init__(self, ipc: SwayIPC):
+        self.ipc = ipc
+        self.commands = []
+
+    def add(self, command: str, con_id: Optional[int] = None) -> 'CommandBatch':
+        if con_id is not None:
+            command = f'[con_id="{con_id}"] {command}'
+        self.commands.append(command)
+        return self
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+    def send(self) -> list:
+        if not self.commands:
+            return []
+        commands, self.commands = self.commands, []
+        results = self.ipc.command('; '.join(commands))
+        # Sway stops at a parse error, pad so there is a result per command
+        while len(results) < len(commands):
+            results.append({'success': False, 'error': 'Command not executed'})
+        return results
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+
+import select
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sway_ipc import SwayIPC, SwayIPCError, EVENT_WINDOW
+
+# Window event changes that only touch the container itself and can be
+# applied in place. Everything else changes the tree shape.
+IN_PLACE_WINDOW_CHANGES = frozenset({'focus', 'title', 'fullscreen_mode', 'urgent', 'mark'})
+
+
+class WindowNode:
+    """Compact record of one sway container"""
+
+    __slots__ = ('id', 'type', 'name', 'app_id', 'window_class', 'pid',
+                 'rect', 'floating', 'workspace', 'output')
+
+    def __init__(self, node: dict, workspace: Optional[str], output: Optional[str], floating: bool):
+        self.id = node.get('id')
+        self.type = node.get('type')
+        self.workspace = workspace
+        self.output = output
+        self.floating = floating
+        self.update(node)
+
+    def update(self, node: dict):
+        """Refresh the mutable fields from a container payload"""
+        get = node.get
+        self.name = get('name')
+        self.app_id = get('app_id')
+        properties = get('window_properties')
+        self.window_class = properties.get('class') if properties else None
+        self.pid = get('pid')
+        rect = get('rect')
+        self.rect = (rect['x'], rect['y'], rect['width'], rect['height']) if rect else (0, 0, 0, 0)
+
+    def __repr__(self):
+        return f"WindowNode(id={self.id}, type={self.type!r}, name={self.name!r})"
+
+
+class WindowIndex:
+    """Flattened view of one sway tree snapshot.
+
+    Built in a single iterative pass, afterwards every lookup is a dict
+    access or a precomputed id list.
+    """
+
+    __slots__ = ('nodes', 'focused_id', 'window_ids', 'by_workspace', 'by_output',
+                 'by_app_id', 'by_class', 'output_workareas')
+
+    def __init__(self, tree: dict):
+        self.nodes: Dict[int, WindowNode] = {}
+        self.focused_id: Optional[int] = None
+        self.window_ids: List[int] = []
+        self.by_workspace: Dict[str, List[int]] = {}
+        self.by_output: Dict[str, List[int]] = {}
+        self.by_app_id: Dict[str, List[int]] = {}
+        self.by_class: Dict[str, List[int]] = {}
+        # Workspace rects exclude bars, so they are the usable output area
+        self.output_workareas: Dict[str, tuple] = {}
+        self._build(tree)
+
+    def _build(self, tree: dict):
+        nodes = self.nodes
+        add_window = self._add_window
+        # (node, workspace name, output name, floating)
+        stack = [(tree, None, None, False)]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            node, workspace, output, floating = pop()
+            node_type = node.get('type')
+            if node_type == 'output':
+                output = node.get('name')
+            elif node_type == 'workspace':
+                workspace = node.get('name')
+
+            record = WindowNode(node, workspace, output, floating)
+            nodes[record.id] = record
+            if node.get('focused'):
+                self.focused_id = record.id
+            if node_type == 'con' and record.name:
+                add_window(record)
+            elif node_type == 'workspace' and output and output != '__i3':
+                self.output_workareas.setdefault(output, record.rect)
+
+            # Push in reverse so the walk keeps the tree order
+            children = node.get('floating_nodes')
+            if children:
+                for child in reversed(children):
+                    push((child, workspace, output, True))
+            children = node.get('nodes')
+            if children:
+                for child in reversed(children):
+                    push((child, workspace, output, floating))
+
+    def _add_window(self, record: WindowNode):
+        self.window_ids.append(record.id)
+        if record.workspace is not None:
+            self.by_workspace.setdefault(record.workspace, []).append(record.id)
+        if record.output is not None:
+            self.by_output.setdefault(record.output, []).append(record.id)
+        if record.app_id:
+            self.by_app_id.setdefault(record.app_id, []).append(record.id)
+        if record.window_class:
+            self.by_class.setdefault(record.window_class, []).append(record.id)
+
+    def focused(self) -> Optional[WindowNode]:
+        return self.nodes.get(self.focused_id)
+
+    def windows(self) -> List[WindowNode]:
+        nodes = self.nodes
+        return [nodes[node_id] for node_id in self.window_ids]
+
+    def _lookup(self, table: Dict[str, List[int]], key: str) -> List[WindowNode]:
+        nodes = self.nodes
+        return [nodes[node_id] for node_id in table.get(key, ())]
+
+    def windows_on_workspace(self, workspace: str) -> List[WindowNode]:
+        return self._lookup(self.by_workspace, workspace)
+
+    def windows_on_output(self, output: str) -> List[WindowNode]:
+        return self._lookup(self.by_output, output)
+
+    def windows_by_app_id(self, app_id: str) -> List[WindowNode]:
+        return self._lookup(self.by_app_id, app_id)
+
+    def windows_by_class(self, window_class: str) -> List[WindowNode]:
+        return self._lookup(self.by_class, window_class)
+
+
+class SwayTreeCache:
+    """In-memory copy of the sway tree kept current by IPC events.
+
+    A background thread subscribes to window, workspace and output events.
+    Focus and title changes are applied in place from the event payload,
+    structural changes trigger one fresh get_tree once the burst of events
+    has been drained. Readers only ever see complete snapshots.
+    """
+
+    def __init__(self, ipc: SwayIPC, reconnect_delay: float = 1.0):
+        self.ipc = ipc
+        self.reconnect_delay = reconnect_delay
+        self._index = None
+        self._events = None
+        self._thread = None
+        self._running = False
+        self._dirty = True
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._event_loop, name='sway-events', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._events:
+            self._events.close()
+
+    @property
+    def is_live(self) -> bool:
+        """True while the event subscription keeps the snapshot current"""
+        return self._running and self._events is not None and not self._dirty
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._dirty = True
+
+    def refresh(self) -> WindowIndex:
+        # An event that arrives while get_tree is in flight bumps the
+        # generation, so the snapshot is kept but the cache stays dirty.
+        generation = self._generation
+        index = WindowIndex(self.ipc.get_tree())
+        with self._lock:
+            self._index = index
+            if self._generation == generation:
+                self._dirty = False
+        return index
+
+    def set_rect(self, node_id: int, rect):
+        """Record a move made by Themis, sway sends no event for floating moves"""
+        with self._lock:
+            # A refresh already in flight may hold an older rect, keep it dirty
+            self._generation += 1
+            record = self._index.nodes.get(node_id) if self._index else None
+            if record is not None:
+                record.rect = tuple(rect)
+                record.floating = True
+
+    def index(self) -> WindowIndex:
+        index = self._index
+        if index is None or not self.is_live:
+            index = self.refresh()
+        return index
+
+    def get_focused(self) -> Optional[WindowNode]:
+        return self.index().focused()
+
+    def get_windows(self) -> List[WindowNode]:
+        return self.index().windows()
+
+    def get_node(self, node_id: int) -> Optional[WindowNode]:
+        return self.index().nodes.get(node_id)
+
+    def _event_loop(self):
+        while self._running:
+            events = SwayIPC(self.ipc.socket_path, timeout=None)
+            try:
+                if not events.subscribe(['window', 'workspace', 'output']):
+                    raise SwayIPCError("sway rejected the event subscription")
+                self._events = events
+                self.refresh()
+                while self._running:
+                    event_type, payload = events.read_event()
+                    self._apply_event(event_type, payload)
+                    if self._dirty and not self._pending(events):
+                        self.refresh()
+            except (SwayIPCError, OSError, ValueError) as e:
+                if self._running:
+                    print(f"sway event subscription lost: {e}")
+            finally:
+                self._events = None
+                self.invalidate()
+                events.close()
+            if self._running:
+                time.sleep(self.reconnect_delay)
+
+    def _pending(self, events: SwayIPC) -> bool:
+        readable, _, _ = select.select([events.fileno()], [], [], 0)
+        return bool(readable)
+
+    def _apply_event(self, event_type: int, payload: dict):
+        index = self._index
+        container = payload.get('container') if event_type == EVENT_WINDOW else None
+        record = index.nodes.get(container.get('id')) if index and container else None
+        if record is None or payload.get('change') not in IN_PLACE_WINDOW_CHANGES:
+            self.invalidate()
+            return
+
+        record.update(container)
+        if payload.get('change') == 'focus':
+            index.focused_id = record.id
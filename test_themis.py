@@ -3,6 +3,10 @@
 import unittest
 import sys
 import os
+import json
+import socket
+import tempfile
+import threading
 from unittest.mock import Mock, patch, MagicMock
 
 # Add the current directory to the path so we can import our modules
@@ -10,6 +14,14 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from config_manager import ConfigManager
 from hotkey_manager import HotkeyManager
+import sway_ipc
+import sway_tree
+from monitors import Monitor, MonitorRegistry
+import animation
+from action_executor import ActionExecutor
+from layouts import LayoutEngine, compile_layouts
+from snap_areas import (SnapArea, SnapZoneIndex, SnapZoneMap, SnapOverlay, SnapPreview,
+                        DragSnapManager, compile_zone_spec)
 
 
 class TestConfigManager(unittest.TestCase):
@@ -91,6 +103,245 @@ class TestHotkeyManager(unittest.TestCase):
         self.hotkey_manager.unregister_hotkey(test_combo)
         self.assertNotIn(test_combo, self.hotkey_manager.hotkeys)
 
+    @patch('hotkey_manager.GLib')
+    def test_most_specific_combo_wins(self, mock_glib):
+        """Test that Super+Ctrl+Left does not fire Super+Left"""
+        from pynput.keyboard import Key
+        snap_left, third_left = Mock(), Mock()
+        self.hotkey_manager.register_hotkey((Key.cmd, Key.left), snap_left)
+        self.hotkey_manager.register_hotkey((Key.cmd, Key.ctrl, Key.left), third_left)
+
+        for key in (Key.cmd_l, Key.ctrl_r, Key.left):
+            self.hotkey_manager._on_press(key)
+        self.hotkey_manager._drain_matched()
+        third_left.assert_called_once_with()
+        snap_left.assert_not_called()
+
+        self.hotkey_manager._on_release(Key.left)
+        self.hotkey_manager._on_release(Key.ctrl_r)
+        self.hotkey_manager._on_press(Key.left)
+        self.hotkey_manager._drain_matched()
+        snap_left.assert_called_once_with()
+        third_left.assert_called_once_with()
+
+        # With only Super+Left bound, extra modifiers are a different combo
+        self.hotkey_manager._on_release(Key.left)
+        self.hotkey_manager.clear_all_hotkeys()
+        self.hotkey_manager.register_hotkey((Key.cmd, Key.left), snap_left)
+        for modifier in (Key.ctrl_l, Key.shift_l):
+            self.hotkey_manager._on_press(modifier)
+            self.hotkey_manager._on_press(Key.left)
+            self.hotkey_manager._on_release(Key.left)
+            self.hotkey_manager._on_release(modifier)
+        self.hotkey_manager._drain_matched()
+        snap_left.assert_called_once_with()
+
+    @patch('hotkey_manager.GLib')
+    def test_trigger_key_required(self, mock_glib):
+        """Test that pressing a modifier after the key does not fire"""
+        from pynput.keyboard import Key, KeyCode
+        self.hotkey_manager.register_hotkey((Key.cmd, Key.left), Mock())
+        self.hotkey_manager._on_press(Key.left)
+        self.hotkey_manager._on_press(Key.cmd)
+        self.hotkey_manager._on_press(KeyCode.from_char('a'))
+        mock_glib.idle_add.assert_not_called()
+
+    @patch('hotkey_manager.GLib')
+    def test_keystroke_burst_single_wakeup(self, mock_glib):
+        """Test that a burst of matches schedules one main loop source"""
+        from pynput.keyboard import Key
+        callback = Mock()
+        self.hotkey_manager.register_hotkey((Key.cmd, Key.left), callback)
+        self.hotkey_manager._on_press(Key.cmd)
+        for _ in range(5):
+            self.hotkey_manager._on_press(Key.left)
+        mock_glib.idle_add.assert_called_once_with(self.hotkey_manager._drain_matched)
+        self.hotkey_manager._drain_matched()
+        self.assertEqual(callback.call_count, 5)
+
+    def test_grabbed_key_dispatch(self):
+        """Test that XGrabKey events run the exact combo's callback directly"""
+        from pynput.keyboard import Key
+        callback = Mock()
+        self.hotkey_manager.register_hotkey((Key.cmd, Key.left), callback)
+        self.assertEqual(self.hotkey_manager._grab_combos(), [(Key.left, 1)])
+        self.hotkey_manager._on_grabbed_key(Key.left, 1)
+        callback.assert_called_once_with()
+
+    @patch('hotkey_manager.GLib')
+    def test_stuck_modifier_reconciled(self, mock_glib):
+        """Test that a modifier whose release was missed is dropped"""
+        from pynput.keyboard import Key
+        window_manager = Mock()
+        keymap = [0] * 32
+        window_manager.display.query_keymap.return_value = keymap
+        hotkey_manager = HotkeyManager(window_manager)
+        hotkey_manager._modifier_keycodes = {1: [133], 2: [37], 4: [64], 8: [50]}
+        snap_left = Mock()
+        hotkey_manager.register_hotkey((Key.cmd, Key.left), snap_left)
+
+        keymap[133 >> 3] = 1 << (133 & 7)
+        hotkey_manager._on_press(Key.cmd)
+        mock_glib.timeout_add.assert_called_once()
+        hotkey_manager.reconcile_modifiers()
+        self.assertEqual(hotkey_manager.get_stats()['reconciled'], 0)
+
+        # The release never arrived, the keyboard says Super is up. The
+        # correction is applied by the listener before its next event.
+        keymap[133 >> 3] = 0
+        self.assertFalse(hotkey_manager.reconcile_modifiers())
+        self.assertEqual(hotkey_manager._modifier_mask, 1)
+        hotkey_manager._on_press(Key.left)
+        self.assertEqual(hotkey_manager.get_stats()['reconciled'], 1)
+        self.assertEqual(len(hotkey_manager._matched), 0)
+        self.assertFalse(hotkey_manager._on_reconcile_timer())
+
+        # A fresh press that races the correction is not lost
+        hotkey_manager._on_press(Key.cmd)
+        keymap[133 >> 3] = 0
+        hotkey_manager.reconcile_modifiers()
+        hotkey_manager._on_press(Key.cmd)
+        hotkey_manager._on_press(Key.left)
+        self.assertEqual(len(hotkey_manager._matched), 1)
+
+    def test_sequence_string_round_trip(self):
+        """Test parsing and generating multi-stroke sequences"""
+        from pynput.keyboard import Key, KeyCode
+        sequence = self.hotkey_manager.parse_hotkey_string("Super+W, 1")
+        self.assertEqual(sequence, ((Key.cmd, KeyCode.from_char('w')), (KeyCode.from_char('1'),)))
+        self.assertEqual(self.hotkey_manager.get_hotkey_string(sequence), "Super+W, 1")
+
+    @patch('hotkey_manager.GLib')
+    def test_sequence_matching(self, mock_glib):
+        """Test that a sequence fires on its last stroke and a miss falls through"""
+        from pynput.keyboard import Key, KeyCode
+        layout, snap_left = Mock(), Mock()
+        self.hotkey_manager.register_hotkey(((Key.cmd, KeyCode.from_char('w')),
+                                             (KeyCode.from_char('1'),)), layout)
+        self.hotkey_manager.register_hotkey((Key.cmd, Key.left), snap_left)
+
+        self.hotkey_manager._on_press(Key.cmd)
+        self.hotkey_manager._on_press(KeyCode.from_char('w'))
+        self.hotkey_manager._on_release(Key.cmd)
+        self.hotkey_manager._on_press(KeyCode.from_char('1'))
+        self.hotkey_manager._drain_matched()
+        layout.assert_called_once_with()
+        self.assertIsNone(self.hotkey_manager._prefix)
+
+        # A stroke that does not continue the prefix is matched from the root
+        self.hotkey_manager._on_press(Key.cmd)
+        self.hotkey_manager._on_press(KeyCode.from_char('w'))
+        self.hotkey_manager._on_press(Key.left)
+        self.hotkey_manager._drain_matched()
+        snap_left.assert_called_once_with()
+        layout.assert_called_once_with()
+
+    @patch('hotkey_manager.time')
+    def test_sequence_timeout(self, mock_time):
+        """Test that an expired prefix does not complete the sequence"""
+        from pynput.keyboard import Key, KeyCode
+        layout = Mock()
+        self.hotkey_manager.register_hotkey(((Key.cmd, KeyCode.from_char('w')),
+                                             (KeyCode.from_char('1'),)), layout)
+        mock_time.monotonic.return_value = 10.0
+        self.hotkey_manager._on_grabbed_key(KeyCode.from_char('w'), 1)
+        mock_time.monotonic.return_value = 10.0 + self.hotkey_manager.sequence_timeout + 0.1
+        self.assertFalse(self.hotkey_manager._on_grabbed_key(KeyCode.from_char('1'), 0))
+        layout.assert_not_called()
+
+    def test_extended_key_names(self):
+        """Test function, navigation, keypad and punctuation key names"""
+        from pynput.keyboard import Key, KeyCode
+        parse = self.hotkey_manager.parse_hotkey_string
+        self.assertEqual(parse("Ctrl+F5"), (Key.ctrl, Key.f5))
+        self.assertEqual(parse("Super+Page_Up"), parse("Super+PgUp"))
+        self.assertEqual(parse("Alt+comma"), (Key.alt, KeyCode.from_char(',')))
+        self.assertEqual(parse("Super+KP_End"), (Key.cmd, KeyCode.from_vk(0xffb1)))
+        for string in ("Super+KP_7", "Ctrl+Home", "Super+Slash", "Shift+F12, KP_Add"):
+            self.assertEqual(self.hotkey_manager.get_hotkey_string(parse(string)), string)
+        self.assertIs(parse("Ctrl+Home"), parse("Ctrl+Home"))
+
+    def test_comma_and_plus_keys(self):
+        """Test that ',' and '+' are keys where a key is expected"""
+        from pynput.keyboard import Key, KeyCode
+        parse = self.hotkey_manager.parse_hotkey_string
+        comma, plus = KeyCode.from_char(','), KeyCode.from_char('+')
+        self.assertEqual(parse("Super+,"), (Key.cmd, comma))
+        self.assertEqual(parse("Super+,"), parse("Super+comma"))
+        self.assertEqual(parse("Ctrl++"), (Key.ctrl, plus))
+        self.assertEqual(parse("Super+,, 1"), ((Key.cmd, comma), (KeyCode.from_char('1'),)))
+        self.assertEqual(parse("Super+W, ,"), ((Key.cmd, KeyCode.from_char('w')), (comma,)))
+        self.assertEqual(parse(self.hotkey_manager.get_hotkey_string((Key.cmd, comma))),
+                         (Key.cmd, comma))
+
+    def test_unmatched_key_replayed_after_prefix(self):
+        """Test that a stroke swallowed by the prefix keyboard grab is sent again"""
+        import x11_hotkeys
+        window_manager = Mock()
+        window_manager.display.keycode_to_keysym.return_value = 0x61
+        on_key = Mock(return_value=False)
+        backend = x11_hotkeys.XGrabKeyBackend(window_manager, on_key)
+        backend._keyboard_grabbed = True
+        event = Mock(detail=38, state=0)
+
+        def end_prefix(trigger, modifiers):
+            backend._keyboard_grabbed = False
+            return False
+        on_key.side_effect = end_prefix
+        with patch.object(x11_hotkeys, 'xtest') as mock_xtest:
+            backend._on_key_press(event)
+            self.assertEqual([c[0] for c in mock_xtest.fake_input.call_args_list],
+                             [(window_manager.display, x11_hotkeys.X.KeyPress, 38),
+                              (window_manager.display, x11_hotkeys.X.KeyRelease, 38)])
+            # A stroke that continued the sequence stays with Themis
+            backend._keyboard_grabbed = True
+            on_key.side_effect = None
+            on_key.return_value = True
+            backend._on_key_press(event)
+            self.assertEqual(mock_xtest.fake_input.call_count, 2)
+
+    def test_keypad_sequence_key_grabbed(self):
+        """Test that a keypad follow-up stroke is found through its digit keysym"""
+        import x11_hotkeys
+        from pynput.keyboard import KeyCode
+        window_manager = Mock()
+        levels = {0: 0xff9c, 1: 0xffb1}
+        window_manager.display.keycode_to_keysym.side_effect = lambda keycode, index: levels[index]
+        on_key = Mock(return_value=True)
+        backend = x11_hotkeys.XGrabKeyBackend(window_manager, on_key)
+        kp_1 = self.hotkey_manager.parse_hotkey_string("KP_1")[0]
+        backend.set_grabs([], [kp_1])
+        backend._keyboard_grabbed = True
+        backend._on_key_press(Mock(detail=87, state=0))
+        on_key.assert_called_once_with(kp_1, 0)
+        self.assertEqual(kp_1, KeyCode.from_vk(0xffb1))
+
+    @patch('builtins.print')
+    def test_unknown_key_rejects_binding(self, mock_print):
+        """Test that a binding with an unresolvable key is rejected, not shortened"""
+        parse = self.hotkey_manager.parse_hotkey_string
+        for string in ("Super+Hyper+Left", "Ctrl+Alt+Bogus", "Super+", "Super+W, Nope"):
+            self.assertEqual(parse(string), ())
+        messages = [call[0][0] for call in mock_print.call_args_list]
+        self.assertTrue(any("'Ctrl+Alt+Bogus'" in message and "'Bogus'" in message
+                            for message in messages))
+
+    def test_keypad_normalized_across_numlock(self):
+        """Test that keypad keys match with NumLock on and off"""
+        from pynput.keyboard import KeyCode
+        with_numlock = self.hotkey_manager._normalize_key(KeyCode(vk=0xffb1, char='1'))
+        without_numlock = self.hotkey_manager._normalize_key(KeyCode.from_vk(0xff9c))
+        self.assertEqual(with_numlock, KeyCode.from_vk(0xffb1))
+        self.assertIs(with_numlock, without_numlock)
+
+    def test_keysym_lookup(self):
+        """Test pynput key to X keysym conversion for grabs"""
+        from pynput.keyboard import Key, KeyCode
+        from x11_hotkeys import keysym_for_key
+        self.assertEqual(keysym_for_key(Key.left), 0xff51)
+        self.assertEqual(keysym_for_key(KeyCode.from_char('1')), 0x31)
+        self.assertEqual(keysym_for_key(KeyCode.from_char('\u20ac')), 0x010020ac)
+
     def test_default_hotkeys(self):
         """Test that default hotkeys are properly defined"""
         self.assertIsInstance(self.hotkey_manager.default_hotkeys, dict)
@@ -134,6 +385,803 @@ class TestWindowManagement(unittest.TestCase):
         self.assertEqual(expected_left_width, 950)
         self.assertEqual(expected_left_height, 1070)
 
+    def test_wnck_move_resize_not_frame_adjusted(self):
+        """Test that Wnck gets the target geometry, only Xlib corrects for frames"""
+        import window_manager
+        manager = window_manager.WindowManager.__new__(window_manager.WindowManager)
+        manager.display = Mock()
+        manager.xlib_backend = None
+        manager.get_frame_extents = Mock(return_value=(2, 2, 30, 2, False))
+        window = Mock(spec=['is_maximized', 'unmaximize', 'set_geometry', 'get_xid'])
+        window.is_maximized.return_value = False
+        manager._x11_move_resize(window, 0, 0, 960, 1080)
+        self.assertEqual(window.set_geometry.call_args[0][2:], (0, 0, 960, 1080))
+
+        manager.xlib_backend = Mock()
+        window.get_xid.return_value = 7
+        manager._x11_move_resize(window, 0, 0, 960, 1080)
+        manager.xlib_backend.queue_move_resize.assert_called_once_with(7, 0, 0, 956, 1048)
+
+    @patch('window_manager.GLib')
+    def test_timed_out_main_loop_call_never_runs(self, mock_glib):
+        """Test that a call that timed out waiting for the main loop is dropped"""
+        import window_manager
+        manager = window_manager.WindowManager.__new__(window_manager.WindowManager)
+        callback = Mock(return_value='moved')
+        results = []
+        worker = threading.Thread(target=lambda: results.append(manager._call_on_main(callback)))
+        worker.start()
+        worker.join()
+        self.assertEqual(results, [None])
+        invoke = mock_glib.idle_add.call_args[0][0]
+        self.assertFalse(invoke())
+        callback.assert_not_called()
+
+    @patch('window_manager.GLib')
+    def test_events_queued_by_round_trip_dispatched(self, mock_glib):
+        """Test that events read along with a reply are dispatched without socket activity"""
+        import window_manager
+        manager = window_manager.WindowManager.__new__(window_manager.WindowManager)
+        manager.display = Mock()
+        event = Mock(type=2)
+        queue = [event]
+        manager.display.pending_events.side_effect = lambda: len(queue)
+        manager.display.next_event.side_effect = queue.pop
+        handler = Mock()
+        manager._x11_handlers = {2: [handler]}
+
+        manager.after_x11_round_trip()
+        drain = mock_glib.idle_add.call_args[0][0]
+        self.assertFalse(drain())
+        handler.assert_called_once_with(event)
+        mock_glib.idle_add.reset_mock()
+        manager.after_x11_round_trip()
+        mock_glib.idle_add.assert_not_called()
+
+    def _xlib_backend(self):
+        import x11_backend
+        display = Mock()
+        display.intern_atom.side_effect = lambda name: 100 + len(name)
+        display.create_resource_object.side_effect = lambda kind, xid: xid
+        return x11_backend, x11_backend.XlibBackend(display)
+
+    def test_xlib_queue_move_resize(self):
+        """Test the _NET_MOVERESIZE_WINDOW payload, negative coordinates included"""
+        x11_backend, backend = self._xlib_backend()
+        backend.queue_move_resize(0x400001, -1920, -20, 800, 600)
+        message = backend.root.send_event.call_args[0][0]
+        flags = (x11_backend.X.NorthWestGravity | x11_backend.MOVERESIZE_X | x11_backend.MOVERESIZE_Y
+                 | x11_backend.MOVERESIZE_WIDTH | x11_backend.MOVERESIZE_HEIGHT
+                 | x11_backend.SOURCE_PAGER << 12)
+        self.assertEqual(message.window, 0x400001)
+        self.assertEqual(list(message.data[1]), [flags, 0xFFFFF880, 0xFFFFFFEC, 800, 600])
+        self.assertEqual(backend.pending, 1)
+        backend.display.flush.assert_not_called()
+        backend.flush()
+        backend.display.flush.assert_called_once()
+        self.assertEqual(backend.pending, 0)
+
+    def test_xlib_queue_maximize(self):
+        """Test the _NET_WM_STATE add and remove payloads"""
+        x11_backend, backend = self._xlib_backend()
+        vert = backend._atoms['_NET_WM_STATE_MAXIMIZED_VERT']
+        horz = backend._atoms['_NET_WM_STATE_MAXIMIZED_HORZ']
+        backend.queue_maximize(0x400001)
+        backend.queue_maximize(0x400001, False)
+        added, removed = [c[0][0] for c in backend.root.send_event.call_args_list]
+        self.assertEqual(added.client_type, backend._atoms['_NET_WM_STATE'])
+        self.assertEqual(list(added.data[1]),
+                         [x11_backend.STATE_ADD, vert, horz, x11_backend.SOURCE_PAGER, 0])
+        self.assertEqual(list(removed.data[1]),
+                         [x11_backend.STATE_REMOVE, vert, horz, x11_backend.SOURCE_PAGER, 0])
+        self.assertEqual(backend.pending, 2)
+
+
+class FakeSwayServer:
+    """Minimal sway IPC server answering on a local Unix socket"""
+
+    def __init__(self, replies, close_after=None):
+        self.replies = replies
+        self.close_after = close_after
+        self.received = []
+        self.connections = 0
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'sway-ipc.sock')
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.path)
+        self.server.listen(5)
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _recv_exact(self, conn, size):
+        data = b''
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            self.connections += 1
+            handled = 0
+            with conn:
+                while self.close_after is None or handled < self.close_after:
+                    header = self._recv_exact(conn, sway_ipc.IPC_HEADER.size)
+                    if header is None:
+                        break
+                    _, length, msg_type = sway_ipc.IPC_HEADER.unpack(header)
+                    payload = self._recv_exact(conn, length) if length else b''
+                    self.received.append((msg_type, payload.decode()))
+                    reply = json.dumps(self.replies[msg_type]).encode()
+                    conn.sendall(sway_ipc.IPC_HEADER.pack(sway_ipc.IPC_MAGIC, len(reply), msg_type) + reply)
+                    handled += 1
+
+    def stop(self):
+        self.server.close()
+        self.tmpdir.cleanup()
+
+
+class TestSwayIPC(unittest.TestCase):
+    def setUp(self):
+        self.tree = {'id': 1, 'type': 'root', 'nodes': [], 'floating_nodes': []}
+        self.replies = {
+            sway_ipc.GET_TREE: self.tree,
+            sway_ipc.RUN_COMMAND: [{'success': True}],
+        }
+
+    def test_persistent_connection(self):
+        """Test that several requests share one socket connection"""
+        server = FakeSwayServer(self.replies)
+        self.addCleanup(server.stop)
+        client = sway_ipc.SwayIPC(server.path)
+        self.addCleanup(client.close)
+
+        self.assertEqual(client.get_tree(), self.tree)
+        self.assertEqual(client.command('[con_id="1"] floating enable'), [{'success': True}])
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(server.received[1], (sway_ipc.RUN_COMMAND, '[con_id="1"] floating enable'))
+
+    def test_reconnect_after_server_close(self):
+        """Test that the client reconnects when sway drops the connection"""
+        server = FakeSwayServer(self.replies, close_after=1)
+        self.addCleanup(server.stop)
+        client = sway_ipc.SwayIPC(server.path)
+        self.addCleanup(client.close)
+
+        self.assertEqual(client.get_tree(), self.tree)
+        self.assertEqual(client.get_tree(), self.tree)
+        self.assertEqual(server.connections, 2)
+
+    def test_command_batch_single_message(self):
+        """Test that a batch is sent as one RUN_COMMAND with a result per command"""
+        self.replies[sway_ipc.RUN_COMMAND] = [{'success': True}, {'success': True}]
+        server = FakeSwayServer(self.replies)
+        self.addCleanup(server.stop)
+        client = sway_ipc.SwayIPC(server.path)
+        self.addCleanup(client.close)
+
+        batch = sway_ipc.CommandBatch(client)
+        batch.add('floating enable', 7).add('resize set 800 600', 7).add('move position 0 0', 7)
+        results = batch.send()
+
+        self.assertEqual(len(server.received), 1)
+        self.assertEqual(server.received[0][1],
+                         '[con_id="7"] floating enable; [con_id="7"] resize set 800 600; '
+                         '[con_id="7"] move position 0 0')
+        self.assertEqual(len(results), 3)
+        self.assertFalse(results[2]['success'])
+        self.assertEqual(len(batch), 0)
+
+    def test_missing_socket(self):
+        """Test that a missing socket raises SwayIPCError"""
+        client = sway_ipc.SwayIPC('/nonexistent/sway-ipc.sock')
+        with self.assertRaises(sway_ipc.SwayIPCError):
+            client.get_tree()
+
+class TestSwayTreeCache(unittest.TestCase):
+    def setUp(self):
+        self.tree = {
+            'id': 1, 'type': 'root', 'nodes': [
+                {'id': 2, 'type': 'workspace', 'name': '1', 'nodes': [
+                    {'id': 10, 'type': 'con', 'name': 'terminal', 'focused': True, 'nodes': []},
+                ], 'floating_nodes': [
+                    {'id': 11, 'type': 'floating_con', 'name': 'dialog', 'nodes': []},
+                ]},
+                {'id': 3, 'type': 'workspace', 'name': '2', 'nodes': [
+                    {'id': 12, 'type': 'con', 'name': 'editor', 'nodes': []},
+                ]},
+            ],
+        }
+        self.ipc = Mock()
+        self.ipc.get_tree.return_value = self.tree
+        self.cache = sway_tree.SwayTreeCache(self.ipc)
+
+    def test_snapshot_lookup(self):
+        """Test focused window and window list lookups from a snapshot"""
+        self.cache.refresh()
+        self.assertEqual(self.cache.get_focused().id, 10)
+        self.assertEqual([w.id for w in self.cache.get_windows()], [10, 12])
+
+    def test_focus_event_applied_in_place(self):
+        """Test that focus events update the cache without a new get_tree"""
+        self.cache.refresh()
+        self.cache._apply_event(sway_ipc.EVENT_WINDOW, {
+            'change': 'focus',
+            'container': {'id': 12, 'type': 'con', 'name': 'editor', 'focused': True},
+        })
+        self.assertFalse(self.cache._dirty)
+        self.assertEqual(self.cache._index.focused().name, 'editor')
+        self.assertEqual(self.ipc.get_tree.call_count, 1)
+
+    def test_index_groupings(self):
+        """Test per-workspace and floating bookkeeping in the window index"""
+        index = sway_tree.WindowIndex(self.tree)
+        self.assertEqual([w.id for w in index.windows_on_workspace('1')], [10])
+        self.assertEqual([w.id for w in index.windows_on_workspace('2')], [12])
+        self.assertTrue(index.nodes[11].floating)
+        self.assertEqual(index.nodes[11].workspace, '1')
+
+    def test_output_workareas(self):
+        """Test that workspace rects are recorded as the usable output area"""
+        tree = {'id': 1, 'type': 'root', 'nodes': [
+            {'id': 4, 'type': 'output', 'name': '__i3', 'nodes': [
+                {'id': 5, 'type': 'workspace', 'name': '__i3_scratch',
+                 'rect': {'x': 0, 'y': 0, 'width': 0, 'height': 0}},
+            ]},
+            {'id': 6, 'type': 'output', 'name': 'eDP-1', 'nodes': [
+                {'id': 7, 'type': 'workspace', 'name': '1',
+                 'rect': {'x': 0, 'y': 30, 'width': 1920, 'height': 1050}},
+            ]},
+        ]}
+        index = sway_tree.WindowIndex(tree)
+        self.assertEqual(index.output_workareas, {'eDP-1': (0, 30, 1920, 1050)})
+
+    def test_structural_event_marks_dirty(self):
+        """Test that new windows and workspace changes invalidate the snapshot"""
+        self.cache.refresh()
+        self.cache._apply_event(sway_ipc.EVENT_WINDOW, {
+            'change': 'new', 'container': {'id': 13, 'type': 'con', 'name': 'new'},
+        })
+        self.assertTrue(self.cache._dirty)
+
+    def test_own_move_recorded(self):
+        """Test that a move made by Themis updates the cached rect"""
+        self.cache.refresh()
+        self.cache.set_rect(11, (100, 50, 800, 600))
+        self.assertEqual(self.cache._index.nodes[11].rect, (100, 50, 800, 600))
+        self.assertEqual(self.ipc.get_tree.call_count, 1)
+
+        # A refresh that raced the move does not leave the cache clean
+        def get_tree():
+            self.cache.set_rect(11, (0, 0, 400, 300))
+            return self.tree
+        self.ipc.get_tree.side_effect = get_tree
+        self.cache._dirty = True
+        self.cache.refresh()
+        self.assertTrue(self.cache._dirty)
+
+    def test_event_during_refresh_keeps_dirty(self):
+        """Test that a refresh racing a newer event does not clear the dirty flag"""
+        def get_tree():
+            self.cache._apply_event(sway_ipc.EVENT_WINDOW, {
+                'change': 'new', 'container': {'id': 13, 'type': 'con', 'name': 'new'},
+            })
+            return self.tree
+        self.ipc.get_tree.side_effect = get_tree
+        self.cache.refresh()
+        self.assertTrue(self.cache._dirty)
+        self.ipc.get_tree.side_effect = None
+        self.cache.refresh()
+        self.assertFalse(self.cache._dirty)
+
+class TestMonitorRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MonitorRegistry()
+        self.left = Monitor('DP-1', 0, 0, 1920, 1080, primary=True)
+        self.right = Monitor('HDMI-1', 1920, -200, 2560, 1440)
+        self.registry.update([self.left, self.right])
+
+    def test_monitor_lookup(self):
+        """Test point and rectangle lookups on a dual monitor layout"""
+        self.assertIs(self.registry.monitor_at(100, 100), self.left)
+        self.assertIs(self.registry.monitor_at(1920, 0), self.right)
+        self.assertIs(self.registry.monitor_at(3000, -100), self.right)
+        self.assertIsNone(self.registry.monitor_at(100, 1200))
+        # Window straddling the boundary belongs to the monitor holding its center
+        self.assertIs(self.registry.monitor_for_rect(1500, 100, 1200, 600), self.right)
+        self.assertIs(self.registry.monitor_for_rect(-500, -500, 10, 10), self.left)
+
+    def test_change_notification(self):
+        """Test that listeners only fire when the layout actually changes"""
+        callback = Mock()
+        self.registry.connect(callback)
+        self.registry.update([Monitor('DP-1', 0, 0, 1920, 1080, primary=True),
+                              Monitor('HDMI-1', 1920, -200, 2560, 1440)])
+        callback.assert_not_called()
+        self.registry.update([self.left])
+        callback.assert_called_once_with(self.registry)
+        self.assertIsNone(self.registry.monitor_at(2000, 0))
+
+class TestWindowAnimator(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.window_manager = Mock()
+        self.window_manager.get_window_key.side_effect = lambda window: window
+        self.window_manager.get_window_geometry.return_value = (0, 0, 100, 100)
+        patcher = patch.object(animation, 'GLib')
+        self.addCleanup(patcher.stop)
+        patcher.start()
+        self.animator = animation.WindowAnimator(self.window_manager, clock=lambda: self.now)
+        self.animator.frame_interval = 0.01
+
+    def test_animation_reaches_target(self):
+        """Test that an animation interpolates and ends exactly on target"""
+        self.animator.animate('win', 100, 0, 200, 100)
+        self.now = 0.05
+        self.animator._tick()
+        x, y, width, height = self.window_manager.move_resize_window.call_args[0][1:]
+        self.assertTrue(0 < x < 100)
+        self.now = 1.0
+        self.assertFalse(self.animator._tick())
+        self.window_manager.move_resize_window.assert_called_with('win', 100, 0, 200, 100)
+
+    def test_coalescing_and_dropped_frames(self):
+        """Test that a new target replaces the running animation and late frames are counted"""
+        self.animator.animate('win', 100, 0, 200, 100)
+        self.now = 0.01
+        self.animator._tick()
+        self.animator.animate('win', 500, 0, 200, 100)
+        self.assertEqual(len(self.animator._animations), 1)
+        self.now = 0.06
+        self.animator._tick()
+        stats = self.animator.get_stats()
+        self.assertEqual(stats['coalesced'], 1)
+        self.assertEqual(stats['dropped_frames'], 4)
+
+    def test_frames_submitted_to_executor(self):
+        """Test that frame moves go to the executor, keyed per window"""
+        submit = Mock()
+        self.animator.submit = submit
+        self.animator.animate('win', 100, 0, 200, 100)
+        self.now = 1.0
+        self.animator._tick()
+        self.window_manager.move_resize_window.assert_not_called()
+        submit.assert_called_once_with('animation_frame', self.window_manager.move_resize_window,
+                                       'win', 100, 0, 200, 100, key=('frame', 'win'))
+
+class TestActionExecutor(unittest.TestCase):
+    def test_actions_run_off_thread(self):
+        """Test that actions run on the worker thread and are timed"""
+        executor = ActionExecutor()
+        executor.start()
+        self.addCleanup(executor.stop)
+        ran = threading.Event()
+        threads = []
+
+        def action():
+            threads.append(threading.current_thread())
+            ran.set()
+
+        self.assertTrue(executor.submit('snap_left', action))
+        self.assertTrue(ran.wait(timeout=1))
+        executor.stop()
+        self.assertIsNot(threads[0], threading.current_thread())
+        self.assertEqual(executor.get_stats()['actions']['snap_left']['count'], 1)
+
+    def test_latest_action_wins(self):
+        """Test that pending actions for the same window are coalesced"""
+        executor = ActionExecutor()
+        first, second, third, other = Mock(), Mock(), Mock(), Mock()
+        executor.submit('snap_left', first, key=42)
+        executor.submit('snap_right', second, key=42)
+        executor.submit('center', other, key=7)
+        executor.submit('maximize', third, key=42)
+        self.assertEqual(executor.queue_depth, 2)
+
+        executor.start()
+        executor.stop()
+        first.assert_not_called()
+        second.assert_not_called()
+        third.assert_called_once_with()
+        other.assert_called_once_with()
+        stats = executor.get_stats()
+        self.assertEqual(stats['superseded'], 2)
+        self.assertEqual(stats['actions']['snap_left']['superseded'], 1)
+
+    def test_bounded_queue(self):
+        """Test that actions are rejected once the queue is full"""
+        executor = ActionExecutor(max_pending=2)
+        self.assertTrue(executor.submit('a', Mock()))
+        self.assertTrue(executor.submit('b', Mock()))
+        self.assertFalse(executor.submit('c', Mock()))
+        self.assertEqual(executor.queue_depth, 2)
+        self.assertEqual(executor.get_stats()['rejected'], 1)
+
+
+class TestSnapZoneIndex(unittest.TestCase):
+    def setUp(self):
+        self.areas = {
+            'left_edge': SnapArea(0, 0, 20, 1080, 'snap_left'),
+            'top_edge': SnapArea(0, 0, 1920, 20, 'maximize'),
+            'top_left': SnapArea(0, 0, 100, 100, 'quarter_top_left'),
+            'left_third': SnapArea(0, 20, 20, 1040, 'third_left'),
+        }
+        self.index = SnapZoneIndex(self.areas, 0, 0, 1920, 1080)
+
+    def test_priority_areas_win(self):
+        """Test that corners and thirds win over overlapping edges"""
+        self.assertEqual(self.index.hit_test(10, 10), 'top_left')
+        self.assertEqual(self.index.hit_test(10, 500), 'left_third')
+        self.assertEqual(self.index.hit_test(500, 10), 'top_edge')
+        self.assertIsNone(self.index.hit_test(500, 500))
+        self.assertIsNone(self.index.hit_test(-5, 10))
+
+    def test_matches_linear_scan(self):
+        """Test the grid against a linear scan over many custom zones"""
+        areas = dict(self.areas)
+        for i in range(40):
+            areas[f'zone_{i}'] = SnapArea(i * 47, (i * 131) % 1000, 90, 70, 'center')
+        index = SnapZoneIndex(areas, 0, 0, 1920, 1080)
+        ordered = sorted(areas.items(), key=lambda item: -item[1].priority)
+        for x in range(0, 1921, 13):
+            for y in range(0, 1081, 17):
+                expected = next((name for name, a in ordered
+                                 if a.x <= x <= a.x + a.width and a.y <= y <= a.y + a.height), None)
+                self.assertEqual(index.hit_test(x, y), expected)
+
+
+class TestSnapZoneMap(unittest.TestCase):
+    def setUp(self):
+        self.left = Monitor('DP-1', 0, 0, 1920, 1080, primary=True)
+        self.right = Monitor('DP-2', 1920, 0, 2560, 1440)
+        self.zones = SnapZoneMap()
+        self.zones.update([self.left, self.right])
+
+    def test_inner_edges_snap(self):
+        """Test that zones on the shared boundary belong to each monitor"""
+        self.assertEqual(self.zones.hit_test(1915, 500), 'DP-1/right_third')
+        self.assertEqual(self.zones.hit_test(1925, 500), 'DP-2/left_third')
+        self.assertEqual(self.zones.hit_test(4470, 1430), 'DP-2/bottom_right')
+        self.assertIsNone(self.zones.hit_test(1000, 1300))
+        self.assertEqual(self.zones.bounds, (0, 0, 4480, 1440))
+
+    def test_zone_spec_compiled(self):
+        """Test snap_threshold edges, disabled zones and custom zones"""
+        actions = {'snap_left', 'third_left', 'center', 'maximize'}
+        spec = compile_zone_spec({
+            'zones': {'top_edge': None},
+            'custom': [{'x': 0.4, 'y': 0, 'width': 0.2, 'height': 40, 'action': 'center'}],
+        }, 30, actions)
+        zones = SnapZoneMap(spec)
+        zones.update([self.left])
+        self.assertEqual(zones.hit_test(25, 500), 'DP-1/left_third')
+        self.assertEqual(zones.hit_test(960, 10), 'DP-1/custom_0')
+        self.assertIsNone(zones.hit_test(500, 10))
+
+    def test_invalid_zone_spec_rejected(self):
+        """Test that bad snap zone specs fail when compiled"""
+        actions = {'snap_left', 'center'}
+        for spec in ({'edges': {}},
+                     {'zones': {'left_edge': 'nope'}},
+                     {'zones': {'middle': 'center'}},
+                     {'corner_size': 5},
+                     {'custom': [{'x': 0, 'y': 0, 'width': 1.5, 'height': 10, 'action': 'center'}]},
+                     {'custom': [{'x': 0, 'y': 0, 'width': 10, 'action': 'center'}]}):
+            with self.assertRaises(ValueError):
+                compile_zone_spec(spec, 20, actions)
+        with self.assertRaises(ValueError):
+            compile_zone_spec({}, 0, actions)
+
+    def test_duplicate_monitor_names(self):
+        """Test that two monitors of the same model both get zones"""
+        first = Monitor('DELL U2415', 0, 0, 1920, 1200)
+        second = Monitor('DELL U2415', 1920, 0, 1920, 1200)
+        zones = SnapZoneMap()
+        zones.update([first, second])
+        self.assertEqual(zones.bounds, (0, 0, 3840, 1200))
+        self.assertEqual(zones.hit_test(5, 600), 'DELL U2415/left_third')
+        self.assertEqual(zones.hit_test(1925, 600), 'DELL U2415#2/left_third')
+        self.assertIs(zones.monitor_of('DELL U2415#2/left_third'), second)
+        self.assertEqual(zones.update([first, second]), [])
+
+    def test_hotplug_is_incremental(self):
+        """Test that only added or changed monitors are rebuilt"""
+        kept = self.zones._zones['DP-1'][1]
+        moved = Monitor('DP-2', 1920, 0, 1920, 1080)
+        self.assertEqual(self.zones.update([self.left, moved]), ['DP-2'])
+        self.assertIs(self.zones._zones['DP-1'][1], kept)
+        self.assertEqual(self.zones.update([self.left]), ['DP-2'])
+        self.assertIsNone(self.zones.hit_test(1925, 500))
+        self.assertNotIn('DP-2/left_edge', self.zones.snap_areas)
+
+
+class TestDragDetection(unittest.TestCase):
+    def make_window_manager(self):
+        window_manager = Mock()
+        window_manager.monitors = MonitorRegistry()
+        window_manager.monitors.update([Monitor('DP-1', 0, 0, 1920, 1080, primary=True)])
+        return window_manager
+
+    @patch('snap_areas.GLib')
+    def test_drag_armed_by_window_move(self, mock_glib):
+        """Test that only a move with the button held starts pointer polling"""
+        window_manager = self.make_window_manager()
+        window = Mock()
+        window.get_geometry.return_value = (100, 100, 800, 600)
+        window_manager.screen.get_active_window.return_value = window
+        manager = DragSnapManager(window_manager, {})
+        self.assertIsNone(manager.mouse_listener)
+
+        # Resizing with the button held is not a drag
+        window.get_geometry.return_value = (0, 0, 960, 1080)
+        window_manager.query_pointer.return_value = (500, 500, True)
+        manager._on_geometry_changed(window)
+        self.assertFalse(manager.is_dragging)
+
+        window.get_geometry.return_value = (40, 0, 960, 1080)
+        manager._on_geometry_changed(window)
+        self.assertTrue(manager.is_dragging)
+        mock_glib.timeout_add.assert_any_call(16, manager._poll_pointer)
+
+        window_manager.query_pointer.return_value = (510, 500, False)
+        self.assertFalse(manager._poll_pointer())
+        self.assertFalse(manager.is_dragging)
+
+    def make_overlay(self, manager):
+        # Stands in for the GTK window, hit tests go through the real zones
+        overlay = Mock(current_area=None)
+
+        def update_mouse_position(x, y):
+            overlay.current_area = manager.zones.hit_test(x, y)
+            return overlay.current_area
+        overlay.update_mouse_position.side_effect = update_mouse_position
+        overlay.get_current_action.side_effect = lambda: (
+            manager.zones.snap_areas[overlay.current_area].action if overlay.current_area else None)
+        return overlay
+
+    @patch('snap_areas.time')
+    @patch('snap_areas.GLib')
+    def test_snap_lands_on_hit_monitor(self, mock_glib, mock_time):
+        """Test that a drop on the inner edge of the right monitor snaps onto that monitor"""
+        window_manager = self.make_window_manager()
+        right = Monitor('DP-2', 1920, 0, 2560, 1440)
+        window_manager.monitors.update([window_manager.monitors.monitors[0], right])
+        window_manager.screen.get_active_window.return_value = None
+        third_left = Mock()
+        manager = DragSnapManager(window_manager, {'third_left': third_left})
+        manager.overlay = self.make_overlay(manager)
+
+        # The window is still mostly on the left monitor when released
+        mock_time.time.return_value = 1.0
+        manager._start_drag(1800, 500, Mock())
+        mock_time.time.return_value = 2.0
+        manager._end_drag(1925, 700)
+        third_left.assert_called_once_with(right)
+
+    @patch('snap_areas.time')
+    @patch('snap_areas.GLib')
+    def test_one_hit_test_per_frame(self, mock_glib, mock_time):
+        """Test that motion events are coalesced per frame and the release is hit tested"""
+        window_manager = self.make_window_manager()
+        window_manager.screen.get_active_window.return_value = None
+        third_left = Mock()
+        manager = DragSnapManager(window_manager, {'third_left': third_left})
+        manager.overlay = self.make_overlay(manager)
+        mock_time.time.return_value = 1.0
+        manager._start_drag(900, 500, Mock())
+
+        for x in range(900, 800, -5):
+            manager._on_mouse_move(x, 500)
+        manager._on_frame_tick(manager.overlay, None)
+        manager._on_frame_tick(manager.overlay, None)
+        self.assertEqual(manager.stats['motion_events'], 20)
+        self.assertEqual(manager.stats['hit_tests'], 1)
+        manager.overlay.update_mouse_position.assert_called_once_with(805, 500)
+
+        # No frame ran for the release position, _end_drag hit tests it itself
+        mock_time.time.return_value = 2.0
+        manager._end_drag(5, 500)
+        self.assertEqual(manager.stats['hit_tests'], 2)
+        third_left.assert_called_once_with(window_manager.monitors.monitors[0])
+
+    @patch('snap_areas.time')
+    @patch('snap_areas.GLib')
+    def test_overlay_prewarmed_and_rebuilt_after_drag(self, mock_glib, mock_time):
+        """Test idle prewarming, deferred hotplug rebuilds and paint latency"""
+        window_manager = self.make_window_manager()
+        window_manager.screen.get_active_window.return_value = None
+        manager = DragSnapManager(window_manager, {})
+        mock_glib.idle_add.assert_called_with(manager._prewarm)
+
+        manager.overlay = Mock(covers_desktop=True)
+        mock_time.time.return_value = mock_time.monotonic.return_value = 5.0
+        manager._start_drag(10, 10, Mock())
+        manager._show_overlay_delayed()
+        mock_time.monotonic.return_value = 5.004
+        manager._on_overlay_draw(manager.overlay, None)
+        manager._on_overlay_draw(manager.overlay, None)
+        stats = manager.get_stats()
+        self.assertEqual(stats['first_paints'], 1)
+        self.assertAlmostEqual(stats['first_paint_max_ms'], 4.0)
+
+        # Zones and the overlay are swapped only once the drag ends
+        window_manager.monitors.update([Monitor('DP-1', 0, 0, 1920, 1080, primary=True),
+                                        Monitor('DP-2', 1920, 0, 1920, 1080)])
+        self.assertEqual(manager.zones.bounds, (0, 0, 1920, 1080))
+        mock_glib.idle_add.reset_mock()
+        manager._end_drag(10, 10)
+        self.assertEqual(manager.zones.bounds, (0, 0, 3840, 1080))
+        mock_glib.idle_add.assert_called_once_with(manager._rebuild_overlay)
+
+    def test_overlay_invalidates_only_changed_areas(self):
+        """Test that a hover change queues redraws of just the old and new highlight"""
+        zones = SnapZoneMap()
+        zones.update([Monitor('DP-1', -1920, 0, 1920, 1080), Monitor('DP-2', 0, 0, 1920, 1080)])
+        overlay = Mock(zones=zones, snap_areas=zones.snap_areas, origin_x=-1920, origin_y=0)
+
+        SnapOverlay.area_changed(overlay, None, 'DP-2/left_third')
+        x, y, width, height = zones.snap_areas['DP-2/left_third'].damage_rect()
+        overlay.queue_draw_area.assert_called_once_with(x + 1920, y, width, height)
+
+        overlay.queue_draw_area.reset_mock()
+        SnapOverlay.area_changed(overlay, 'DP-2/left_third', 'DP-1/right_third')
+        x2, y2, width2, height2 = zones.snap_areas['DP-1/right_third'].damage_rect()
+        self.assertEqual([c[0] for c in overlay.queue_draw_area.call_args_list],
+                         [(x + 1920, y, width, height), (x2 + 1920, y2, width2, height2)])
+        overlay.queue_draw.assert_not_called()
+
+    @patch('snap_areas.GLib')
+    def test_delayed_show_after_cleanup(self, mock_glib):
+        """Test that the delayed show is a no-op once the manager is cleaned up"""
+        window_manager = self.make_window_manager()
+        window_manager.screen.get_active_window.return_value = None
+        manager = DragSnapManager(window_manager, {})
+        manager._start_drag(10, 10, Mock())
+        manager.cleanup()
+        self.assertFalse(manager._show_overlay_delayed())
+        self.assertIsNone(manager.overlay)
+
+    def test_preview_shown_only_with_target(self):
+        """Test that the preview is placed on the hit monitor and hidden without a target"""
+        zones = SnapZoneMap()
+        right = Monitor('DP-2', 1920, 0, 2560, 1440)
+        zones.update([Monitor('DP-1', 0, 0, 1920, 1080), right])
+        provider = Mock(side_effect=lambda action, monitor: (1920, 0, 1280, 1440)
+                        if action == 'snap_left' else None)
+        # Stands in for the GTK window, the methods under test are the real ones
+        preview = Mock(zones=zones, snap_areas=zones.snap_areas, geometry_provider=provider,
+                       current_area=None)
+
+        SnapPreview.area_changed(preview, None, 'DP-2/left_edge')
+        provider.assert_called_once_with('snap_left', right)
+        preview.move.assert_called_once_with(1920, 0)
+        preview.resize.assert_called_once_with(1280, 1440)
+        preview.show.assert_called_once_with()
+        preview.hide.assert_not_called()
+
+        SnapPreview.area_changed(preview, 'DP-2/left_edge', None)
+        preview.hide.assert_called_once_with()
+        SnapPreview.area_changed(preview, None, 'DP-2/bottom_edge')
+        self.assertEqual(preview.hide.call_count, 2)
+
+        SnapPreview.update_mouse_position(preview, 4000, 1435)
+        self.assertEqual(preview.current_area, 'DP-2/bottom_edge')
+        preview.area_changed.assert_called_once_with(None, 'DP-2/bottom_edge')
+        self.assertEqual(SnapPreview.get_current_action(preview), 'center')
+
+    @patch('snap_areas.time')
+    @patch('snap_areas.GLib')
+    def test_hidden_preview_hit_tested_on_timer(self, mock_glib, mock_time):
+        """Test that hit tests fall back to a timer while the preview is unmapped"""
+        window_manager = self.make_window_manager()
+        window_manager.screen.get_active_window.return_value = None
+        manager = DragSnapManager(window_manager, {})
+        manager.overlay = self.make_overlay(manager)
+        manager.overlay.get_visible.return_value = False
+        mock_time.time.return_value = mock_time.monotonic.return_value = 1.0
+        manager._start_drag(500, 500, Mock())
+        manager._show_overlay_delayed()
+        mock_glib.timeout_add.assert_called_with(16, manager._on_timer_tick)
+        manager.overlay.add_tick_callback.assert_not_called()
+        self.assertTrue(manager._on_timer_tick())
+
+        # Once the preview is mapped its frame clock takes over
+        manager.overlay.get_visible.return_value = True
+        self.assertFalse(manager._on_timer_tick())
+        manager.overlay.add_tick_callback.assert_called_once_with(manager._on_frame_tick)
+        manager.overlay.get_visible.return_value = False
+        self.assertFalse(manager._on_frame_tick(manager.overlay, None))
+        mock_glib.timeout_add.assert_called_with(16, manager._on_timer_tick)
+
+    @patch('snap_areas.time')
+    @patch('snap_areas.GLib')
+    def test_preview_first_paint_recorded(self, mock_glib, mock_time):
+        """Test that the paint latency is measured when the preview maps itself"""
+        window_manager = self.make_window_manager()
+        window_manager.screen.get_active_window.return_value = None
+        manager = DragSnapManager(window_manager, {})
+        manager.overlay = self.make_overlay(manager)
+        manager.overlay.get_visible.return_value = False
+        update = manager.overlay.update_mouse_position.side_effect
+
+        def map_on_target(x, y):
+            name = update(x, y)
+            manager.overlay.get_visible.return_value = name is not None
+            return name
+        manager.overlay.update_mouse_position.side_effect = map_on_target
+        mock_time.time.return_value = mock_time.monotonic.return_value = 1.0
+        manager._start_drag(500, 500, Mock())
+        manager._show_overlay_delayed()
+        self.assertIsNone(manager._show_requested)
+
+        manager._on_mouse_move(5, 500)
+        manager._on_timer_tick()
+        mock_time.monotonic.return_value = 1.01
+        manager._on_overlay_draw(manager.overlay, None)
+        stats = manager.get_stats()
+        self.assertEqual(stats['first_paints'], 1)
+        self.assertAlmostEqual(stats['first_paint_max_ms'], 10.0)
+
+
+class TestLayoutEngine(unittest.TestCase):
+    def test_default_layouts(self):
+        """Test the built-in layouts on an odd sized, offset workarea"""
+        engine = LayoutEngine(compile_layouts())
+        workarea = (1366, 24, 1365, 743)
+        sx, sy, sw, sh = workarea
+        m = 5
+        self.assertEqual(engine.rect_for('snap_left', workarea, m), (sx + m, sy + m, sw // 2 - 2 * m, sh - 2 * m))
+        self.assertEqual(engine.rect_for('quarter_bottom_right', workarea, m),
+                         (sx + sw // 2 + m, sy + sh // 2 + m, sw // 2 - 2 * m, sh // 2 - 2 * m))
+        self.assertEqual(engine.rect_for('third_right', workarea, m),
+                         (sx + sw * 2 // 3 + m, sy + m, sw // 3 - 2 * m, sh - 2 * m))
+        width, height = sw * 2 // 3, sh * 2 // 3
+        self.assertEqual(engine.rect_for('center', workarea, m),
+                         (sx + (sw - width) // 2, sy + (sh - height) // 2, width, height))
+        self.assertIsNone(engine.rect_for('maximize', workarea, m))
+
+    def test_custom_layouts(self):
+        """Test config layouts, removal and table reuse"""
+        layouts = compile_layouts({
+            'ninth_center': {'x': '1/3', 'y': '1/3', 'width': '1/3', 'height': '1/3'},
+            'sixth_left': {'x': 0, 'y': 0.5, 'width': '1/3', 'height': 0.5, 'margin': False},
+            'third_top': None,
+        })
+        engine = LayoutEngine(layouts)
+        self.assertNotIn('third_top', engine.names)
+        self.assertEqual(engine.rect_for('ninth_center', (0, 0, 1920, 1080), 0), (640, 360, 640, 360))
+        self.assertEqual(engine.rect_for('sixth_left', (0, 0, 1920, 1080), 10), (0, 540, 640, 540))
+        table = engine._tables[((0, 0, 1920, 1080), 10)]
+        engine.rect_for('snap_left', (0, 0, 1920, 1080), 10)
+        self.assertIs(engine._tables[((0, 0, 1920, 1080), 10)], table)
+        engine.invalidate()
+        self.assertEqual(engine._tables, {})
+
+        for spec in ({'x': 0, 'y': 0, 'width': '3/2', 'height': 1},
+                     {'x': 0, 'y': 0, 'width': 'half', 'height': 1},
+                     {'x': 0, 'y': 0, 'height': 1},
+                     {'x': 0, 'y': 0, 'width': 0, 'height': 1},
+                     {'x': '2/3', 'y': 0, 'width': '1/2', 'height': 1},
+                     {'x': 0, 'y': 0.75, 'width': 1, 'height': 0.5}):
+            with self.assertRaises(ValueError):
+                compile_layouts({'bad': spec})
+        compile_layouts({'wide_center': {'x': 'center', 'y': 0.5, 'width': 1, 'height': 0.5}})
+
+    def test_removed_layout_disables_zones(self):
+        """Test that built-in zones of a removed layout are dropped when compiled"""
+        actions = set(compile_layouts({'third_left': None})) | {'maximize'}
+        zones = SnapZoneMap(compile_zone_spec({}, 20, actions))
+        zones.update([Monitor('DP-1', 0, 0, 1920, 1080)])
+        self.assertNotIn('DP-1/left_third', zones.snap_areas)
+        self.assertIn('DP-1/right_third', zones.snap_areas)
+        self.assertEqual(zones.hit_test(5, 500), 'DP-1/left_edge')
+
 
 def run_basic_functionality_test():
     """Run a basic test to check if the application can be imported and initialized"""
@@ -4,7 +4,9 @@ import sys
 import os
 import signal
 import argparse
-from typing import Dict, Callable
+import json
+import functools
+from typing import Dict, Callable, Optional, Tuple
 
 import gi
 gi.require_version('Gtk', '3.0')
@@ -14,34 +16,40 @@ from gi.repository import Gtk, GLib, AppIndicator3
 
 from window_manager import WindowManager
 from hotkey_manager import HotkeyManager
-from snap_areas import DragSnapManager
+from snap_areas import DragSnapManager, DEFAULT_ZONE_SPEC, compile_zone_spec
+from layouts import LayoutEngine, compile_layouts
 from config_manager import ConfigManager
 from config_gui import ConfigWindow
+from animation import WindowAnimator
+from action_executor import ActionExecutor
 
 
 class Themis:
     def __init__(self):
         self.config_manager = ConfigManager()
-        self.window_manager = WindowManager()
-        self.hotkey_manager = HotkeyManager()
+        self.window_manager = WindowManager(self.config_manager.get_value('x11_backend', 'wnck'))
+        self.hotkey_manager = HotkeyManager(
+            self.window_manager,
+            self.config_manager.get_value('hotkey_backend', 'auto'),
+            self.config_manager.get_value('sequence_timeout', 1000) / 1000.0)
+        self.executor = ActionExecutor()
+        # Frames are timed on the main loop, their moves run on the executor
+        self.animator = WindowAnimator(self.window_manager, submit=self.executor.submit)
         self.drag_snap_manager = None
         self.config_window = None
+        self._zone_spec_source = None
+        self.zone_spec = DEFAULT_ZONE_SPEC
         
-        # Set up actions
-        self.actions: Dict[str, Callable] = {
-            'snap_left': self.snap_left,
-            'snap_right': self.snap_right,
-            'maximize': self.maximize,
-            'center': self.center,
-            'quarter_top_left': self.quarter_top_left,
-            'quarter_top_right': self.quarter_top_right,
-            'quarter_bottom_left': self.quarter_bottom_left,
-            'quarter_bottom_right': self.quarter_bottom_right,
-            'third_left': self.third_left,
-            'third_right': self.third_right,
-            'third_top': self.third_top,
-            'third_bottom': self.third_bottom,
-        }
+        # Set up actions, the handlers run on the action executor thread.
+        # Both dicts are updated in place when the layouts change.
+        self._action_handlers: Dict[str, Callable] = {}
+        self.actions: Dict[str, Callable] = {}
+        self._layouts_source = None
+        self.layout_engine = None
+        self._load_layouts()
+        self.window_manager.monitors.connect(self._on_monitors_changed)
+        self.executor.start()
+        self._compile_zone_spec()
         
         # Set up system tray
         self._setup_system_tray()
@@ -51,7 +59,55 @@ class Themis:
         
         # Set up drag-to-snap if enabled
         if self.config_manager.get_value('enable_drag_snap', True):
-            self.drag_snap_manager = DragSnapManager(self.window_manager, self.actions)
+            self.drag_snap_manager = self._create_drag_snap_manager()
+
+    def _create_drag_snap_manager(self) -> DragSnapManager:
+        return DragSnapManager(self.window_manager, self.actions,
+                               self.config_manager.get_value('drag_preview', 'overlay'),
+                               self.get_action_geometry, self.zone_spec)
+
+    def _load_layouts(self) -> bool:
+        """Compile the layout config if it changed, returns True if it did"""
+        config = self.config_manager.get_value('layouts', {})
+        source = json.dumps(config, sort_keys=True)
+        if source == self._layouts_source:
+            return False
+        self._layouts_source = source
+        try:
+            layouts = compile_layouts(config)
+        except ValueError as e:
+            print(f"Invalid layout config, using the default layouts: {e}")
+            layouts = compile_layouts()
+        self.layout_engine = LayoutEngine(layouts)
+
+        self._action_handlers.clear()
+        self._action_handlers['maximize'] = self.maximize
+        for name in self.layout_engine.names:
+            self._action_handlers[name] = functools.partial(self._snap_to_position, name)
+        self.actions.clear()
+        self.actions.update((name, functools.partial(self.run_action, name))
+                            for name in self._action_handlers)
+        return True
+
+    def _on_monitors_changed(self, registry):
+        self.layout_engine.invalidate()
+
+    def _compile_zone_spec(self) -> bool:
+        """Compile the snap zone config if it or the layouts changed, returns True if it did"""
+        # Zones refer to layouts by name, a removed layout has to drop its zones
+        source = (self.config_manager.get_value('snap_threshold', 20),
+                  json.dumps(self.config_manager.get_value('snap_zones', {}), sort_keys=True),
+                  tuple(sorted(self.actions)))
+        if source == self._zone_spec_source:
+            return False
+        self._zone_spec_source = source
+        try:
+            self.zone_spec = compile_zone_spec(self.config_manager.get_value('snap_zones', {}),
+                                               source[0], self.actions)
+        except ValueError as e:
+            print(f"Invalid snap zone config, using the default zones: {e}")
+            self.zone_spec = compile_zone_spec({}, DEFAULT_ZONE_SPEC.edge_width, self.actions)
+        return True
 
     def _setup_system_tray(self):
         self.indicator = AppIndicator3.Indicator.new(
@@ -138,9 +194,16 @@ class Themis:
             self._register_hotkeys()
         elif section == 'behavior':
             # Handle behavior changes
+            if self._load_layouts():
+                self.hotkey_manager.clear_all_hotkeys()
+                self._register_hotkeys()
+                self.indicator.set_menu(self._create_menu())
+            spec_changed = self._compile_zone_spec()
             if self.config_manager.get_value('enable_drag_snap', True):
                 if self.drag_snap_manager is None:
-                    self.drag_snap_manager = DragSnapManager(self.window_manager, self.actions)
+                    self.drag_snap_manager = self._create_drag_snap_manager()
+                elif spec_changed:
+                    self.drag_snap_manager.set_zone_spec(self.zone_spec)
             else:
                 if self.drag_snap_manager:
                     self.drag_snap_manager.cleanup()
@@ -161,124 +224,71 @@ class Themis:
         self.cleanup()
         Gtk.main_quit()
 
+    def run_action(self, name: str, monitor=None):
+        # Returns None so it can be used directly as a GLib idle callback.
+        # Every action targets the active window, so a newer action for the
+        # same window replaces one that has not started yet. Drag snaps pass
+        # the monitor of the zone that was hit.
+        key = self.window_manager.get_active_window_key() or 'active'
+        self.executor.submit(name, self._action_handlers[name], monitor, key=key)
+
     def cleanup(self):
         if self.hotkey_manager:
             self.hotkey_manager.stop_listening()
+        self.executor.stop()
         if self.drag_snap_manager:
             self.drag_snap_manager.cleanup()
+        if self.window_manager:
+            self.window_manager.cleanup()
+        if self.config_manager.get_value('debug_mode', False):
+            print(f"Animation stats: {self.animator.get_stats()}")
+            print(f"Action stats: {self.executor.get_stats()}")
+            print(f"Hotkey stats: {self.hotkey_manager.get_stats()}")
+            if self.drag_snap_manager:
+                print(f"Drag snap stats: {self.drag_snap_manager.get_stats()}")
 
     # Window action methods
-    def snap_left(self):
-        self._snap_to_position('left')
-
-    def snap_right(self):
-        self._snap_to_position('right')
-
-    def maximize(self):
+    def maximize(self, monitor=None):
         window = self.window_manager.get_active_window()
-        if window:
-            self.window_manager.maximize_window(window)
-
-    def center(self):
-        self._snap_to_position('center')
-
-    def quarter_top_left(self):
-        self._snap_to_position('quarter_top_left')
-
-    def quarter_top_right(self):
-        self._snap_to_position('quarter_top_right')
-
-    def quarter_bottom_left(self):
-        self._snap_to_position('quarter_bottom_left')
-
-    def quarter_bottom_right(self):
-        self._snap_to_position('quarter_bottom_right')
-
-    def third_left(self):
-        self._snap_to_position('third_left')
-
-    def third_right(self):
-        self._snap_to_position('third_right')
+        if not window:
+            return
+        if monitor is not None and self.window_manager.get_monitor_for_window(window) is not monitor:
+            # Maximizing keeps the window on its monitor, move it over first
+            self.executor.run_on_main(self.animator.cancel, window)
+            self.window_manager.move_resize_window(window, *self.window_manager.get_workarea(monitor=monitor))
+        self.window_manager.maximize_window(window)
 
-    def third_top(self):
-        self._snap_to_position('third_top')
+    def _snap_to_position(self, position: str, monitor=None):
+        window = self.window_manager.get_active_window()
+        if not window:
+            return
 
-    def third_bottom(self):
-        self._snap_to_position('third_bottom')
+        geometry = self._target_geometry(position, self.window_manager.get_workarea(window, monitor))
+        if geometry:
+            self._apply_geometry(window, *geometry)
 
-    def _snap_to_position(self, position: str):
+    def get_action_geometry(self, action: str, monitor=None) -> Optional[Tuple[int, int, int, int]]:
+        """Where the active window would land for action, used by the drag preview"""
         window = self.window_manager.get_active_window()
         if not window:
-            return
+            return None
+        workarea = self.window_manager.get_workarea(window, monitor)
+        if action == 'maximize':
+            return workarea
+        return self._target_geometry(action, workarea)
 
-        screen_x, screen_y, screen_width, screen_height = self.window_manager.get_screen_geometry()
+    def _target_geometry(self, position: str, workarea) -> Optional[Tuple[int, int, int, int]]:
         margin = self.config_manager.get_value('window_margin', 5)
-        
-        # Calculate target geometry based on position
-        if position == 'left':
-            x, y = screen_x + margin, screen_y + margin
-            width, height = screen_width // 2 - margin * 2, screen_height - margin * 2
-        
-        elif position == 'right':
-            x = screen_x + screen_width // 2 + margin
-            y = screen_y + margin
-            width, height = screen_width // 2 - margin * 2, screen_height - margin * 2
-        
-        elif position == 'center':
-            width, height = screen_width * 2 // 3, screen_height * 2 // 3
-            x = screen_x + (screen_width - width) // 2
-            y = screen_y + (screen_height - height) // 2
-        
-        elif position == 'quarter_top_left':
-            x, y = screen_x + margin, screen_y + margin
-            width = screen_width // 2 - margin * 2
-            height = screen_height // 2 - margin * 2
-        
-        elif position == 'quarter_top_right':
-            x = screen_x + screen_width // 2 + margin
-            y = screen_y + margin
-            width = screen_width // 2 - margin * 2
-            height = screen_height // 2 - margin * 2
-        
-        elif position == 'quarter_bottom_left':
-            x = screen_x + margin
-            y = screen_y + screen_height // 2 + margin
-            width = screen_width // 2 - margin * 2
-            height = screen_height // 2 - margin * 2
-        
-        elif position == 'quarter_bottom_right':
-            x = screen_x + screen_width // 2 + margin
-            y = screen_y + screen_height // 2 + margin
-            width = screen_width // 2 - margin * 2
-            height = screen_height // 2 - margin * 2
-        
-        elif position == 'third_left':
-            x, y = screen_x + margin, screen_y + margin
-            width = screen_width // 3 - margin * 2
-            height = screen_height - margin * 2
-        
-        elif position == 'third_right':
-            x = screen_x + screen_width * 2 // 3 + margin
-            y = screen_y + margin
-            width = screen_width // 3 - margin * 2
-            height = screen_height - margin * 2
-        
-        elif position == 'third_top':
-            x, y = screen_x + margin, screen_y + margin
-            width = screen_width - margin * 2
-            height = screen_height // 3 - margin * 2
-        
-        elif position == 'third_bottom':
-            x = screen_x + margin
-            y = screen_y + screen_height * 2 // 3 + margin
-            width = screen_width - margin * 2
-            height = screen_height // 3 - margin * 2
-        
-        else:
-            return
+        return self.layout_engine.rect_for(position, workarea, margin)
 
-        # Apply the new geometry
-        self.window_manager.move_resize_window(window, x, y, width, height)
+    def _apply_geometry(self, window, x: int, y: int, width: int, height: int):
+        if self.config_manager.get_value('enable_animations', True):
+            # Animation frames are driven by a main loop timer
+            speed = self.config_manager.get_value('animation_speed', 1.0)
+            self.executor.run_on_main(self.animator.animate, window, x, y, width, height, speed)
+        else:
+            self.executor.run_on_main(self.animator.cancel, window)
+            self.window_manager.move_resize_window(window, x, y, width, height)
 
     def run(self):
         # Start hotkey listening
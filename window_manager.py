@@ -2,7 +2,7 @@
 
 import os
 import sys
-import subprocess
+import threading
 from typing import Tuple, Optional, List
 import gi
 
@@ -10,88 +10,369 @@ gi.require_version('Gtk', '3.0')
 gi.require_version('Gdk', '3.0')
 gi.require_version('Wnck', '3.0')
 
-from gi.repository import Gtk, Gdk, Wnck, GObject
+from gi.repository import Gtk, Gdk, Wnck, GObject, GLib
 
 try:
-    from Xlib import display as x_display
+    from Xlib import X, Xatom, display as x_display
     from Xlib.ext import randr
+    from x11_backend import XlibBackend
     XLIB_AVAILABLE = True
 except ImportError:
     XLIB_AVAILABLE = False
 
+from sway_ipc import SwayIPC, SwayIPCError, CommandBatch
+from sway_tree import SwayTreeCache
+from monitors import Monitor, MonitorRegistry, Rect
+
 
 class WindowManager:
-    def __init__(self):
+    def __init__(self, x11_backend: str = 'wnck'):
         self.is_wayland = os.environ.get('XDG_SESSION_TYPE') == 'wayland'
         self.display = None
+        self.xlib_backend = None
+        self.sway = None
+        self.tree_cache = None
+        if self.is_wayland:
+            self.sway = SwayIPC()
+            self.tree_cache = SwayTreeCache(self.sway)
+            self.tree_cache.start()
         
         if not self.is_wayland and XLIB_AVAILABLE:
             try:
                 self.display = x_display.Display()
             except:
                 self.display = None
+            if self.display and x11_backend == 'xlib':
+                self.xlib_backend = XlibBackend(self.display)
         
         self.screen = None
         if not self.is_wayland:
             Wnck.Screen.get_default().force_update()
             self.screen = Wnck.Screen.get_default()
 
-    def get_screen_geometry(self) -> Tuple[int, int, int, int]:
-        if self.is_wayland:
-            return self._get_wayland_screen_geometry()
-        else:
-            return self._get_x11_screen_geometry()
+        self._x11_handlers = {}
+        self._x11_watch = None
+        self._atoms = {}
+        self._net_workareas = None
+        self._frame_extents = {}
+        self.monitors = MonitorRegistry()
+        self._use_randr = False
+        self._setup_x11_properties()
+        self._setup_monitor_tracking()
+
+    def _call_on_main(self, callback, *args):
+        """Run callback on the GTK main loop and wait for its result.
+
+        Wnck and GDK objects are not thread-safe, window actions running on
+        the action executor use this for every call into them.
+        """
+        if threading.current_thread() is threading.main_thread():
+            return callback(*args)
+
+        done = threading.Event()
+        lock = threading.Lock()
+        result = []
+        # 'started' or 'cancelled', whichever side gets there first
+        state = []
+
+        def invoke():
+            with lock:
+                if state:
+                    # Timed out, a newer action may already have run
+                    return False
+                state.append('started')
+            try:
+                result.append(callback(*args))
+            finally:
+                done.set()
+            return False
+
+        GLib.idle_add(invoke)
+        if not done.wait(timeout=1):
+            with lock:
+                if not state:
+                    state.append('cancelled')
+                    print("Timed out waiting for the main loop")
+                    return None
+            # Already running, wait so actions stay in order
+            done.wait()
+        return result[0] if result else None
 
-    def _get_wayland_screen_geometry(self) -> Tuple[int, int, int, int]:
+    def add_x11_handler(self, event_type: int, callback):
+        """Dispatch X events of event_type from our Xlib connection to callback"""
+        self._x11_handlers.setdefault(event_type, []).append(callback)
+        if self._x11_watch is None and self.display:
+            self._x11_watch = GLib.io_add_watch(self.display.fileno(), GLib.PRIORITY_DEFAULT,
+                                                GLib.IO_IN, self._on_x11_events)
+
+    def remove_x11_handler(self, event_type: int, callback):
+        handlers = self._x11_handlers.get(event_type, [])
+        if callback in handlers:
+            handlers.remove(callback)
+
+    def _on_x11_events(self, source, condition):
+        self._dispatch_x11_events()
+        return True
+
+    def _dispatch_x11_events(self):
         try:
-            gdk_display = Gdk.Display.get_default()
-            monitor = gdk_display.get_primary_monitor()
-            if monitor:
-                geometry = monitor.get_geometry()
-                return geometry.x, geometry.y, geometry.width, geometry.height
-        except:
-            pass
-        
-        return 0, 0, 1920, 1080
+            while self.display.pending_events():
+                event = self.display.next_event()
+                for callback in self._x11_handlers.get(event.type, ()):
+                    callback(event)
+        except Exception as e:
+            print(f"X11 event error: {e}")
+        return False
+
+    def after_x11_round_trip(self):
+        """Call after waiting for a reply on our Xlib connection.
+
+        Reading the reply also moves any events sent before it into
+        python-xlib's queue. The socket is then empty and the fd watch does
+        not fire, so the queued events are dispatched from an idle callback.
+        """
+        if self.display and self._x11_handlers and self.display.pending_events():
+            GLib.idle_add(self._dispatch_x11_events)
+
+    def _setup_x11_properties(self):
+        if not self.display:
+            return
+        try:
+            for name in ('_NET_WORKAREA', '_NET_CURRENT_DESKTOP', '_NET_FRAME_EXTENTS',
+                         '_GTK_FRAME_EXTENTS'):
+                self._atoms[name] = self.display.intern_atom(name)
+            root = self.display.screen().root
+            root.change_attributes(event_mask=X.PropertyChangeMask)
+            self.add_x11_handler(X.PropertyNotify, self._on_property_notify)
+        except Exception as e:
+            print(f"Failed to watch X11 properties: {e}")
+        if self.screen:
+            self.screen.connect('window-closed', self._on_window_closed)
+
+    def _on_property_notify(self, event):
+        atom = event.atom
+        if event.window == self.display.screen().root:
+            if atom in (self._atoms['_NET_WORKAREA'], self._atoms['_NET_CURRENT_DESKTOP']):
+                self._net_workareas = None
+                self._refresh_monitors()
+        elif atom in (self._atoms['_NET_FRAME_EXTENTS'], self._atoms['_GTK_FRAME_EXTENTS']):
+            self._frame_extents.pop(event.window.id, None)
+
+    def _on_window_closed(self, screen, window):
+        self._frame_extents.pop(window.get_xid(), None)
+
+    def _get_cardinals(self, window, atom_name: str) -> Optional[List[int]]:
+        prop = window.get_full_property(self._atoms[atom_name], Xatom.CARDINAL)
+        self.after_x11_round_trip()
+        return list(prop.value) if prop else None
+
+    def _get_net_workareas(self) -> List[Rect]:
+        """_NET_WORKAREA of the current desktop, read once per change"""
+        if self._net_workareas is None:
+            root = self.display.screen().root
+            values = self._get_cardinals(root, '_NET_WORKAREA') or []
+            desktop = (self._get_cardinals(root, '_NET_CURRENT_DESKTOP') or [0])[0]
+            offset = desktop * 4
+            if len(values) < offset + 4:
+                offset = 0
+            self._net_workareas = [tuple(values[offset:offset + 4])] if len(values) >= 4 else []
+        return self._net_workareas
+
+    def _apply_workareas(self, monitors: List[Monitor]):
+        for area in self._get_net_workareas():
+            for monitor in monitors:
+                x = max(monitor.x, area[0])
+                y = max(monitor.y, area[1])
+                right = min(monitor.x + monitor.width, area[0] + area[2])
+                bottom = min(monitor.y + monitor.height, area[1] + area[3])
+                if right > x and bottom > y:
+                    monitor.workarea = (x, y, right - x, bottom - y)
+
+    def get_frame_extents(self, window) -> Tuple[int, int, int, int, bool]:
+        """(left, right, top, bottom, client_side) extents of an X11 window.
+
+        Server-side frames (_NET_FRAME_EXTENTS) sit outside the client area,
+        client-side decorations (_GTK_FRAME_EXTENTS) are invisible shadow
+        borders inside it. Cached per window until the property changes.
+        """
+        xid = window.get_xid()
+        extents = self._frame_extents.get(xid)
+        if extents is None:
+            extents = (0, 0, 0, 0, False)
+            try:
+                x_window = self.display.create_resource_object('window', xid)
+                x_window.change_attributes(event_mask=X.PropertyChangeMask)
+                values = self._get_cardinals(x_window, '_GTK_FRAME_EXTENTS')
+                if values and len(values) == 4:
+                    extents = (*values, True)
+                else:
+                    values = self._get_cardinals(x_window, '_NET_FRAME_EXTENTS')
+                    if values and len(values) == 4:
+                        extents = (*values, False)
+            except Exception as e:
+                print(f"Failed to read frame extents: {e}")
+            self._frame_extents[xid] = extents
+        return extents
+
+    def _adjust_for_frame(self, window, x: int, y: int, width: int, height: int) -> Rect:
+        left, right, top, bottom, client_side = self.get_frame_extents(window)
+        if client_side:
+            # Grow the client so its visible part fills the target
+            return x - left, y - top, width + left + right, height + top + bottom
+        # The WM frame is added around the client size we request
+        return x, y, width - left - right, height - top - bottom
+
+    def _setup_monitor_tracking(self):
+        if self.display:
+            try:
+                root = self.display.screen().root
+                if self.display.has_extension('RANDR') and hasattr(root, 'xrandr_get_monitors'):
+                    root.xrandr_select_input(randr.RRScreenChangeNotifyMask)
+                    self.add_x11_handler(self.display.extension_event.ScreenChangeNotify,
+                                         self._on_screen_change)
+                    self._use_randr = True
+            except Exception as e:
+                print(f"RandR unavailable: {e}")
 
-    def _get_x11_screen_geometry(self) -> Tuple[int, int, int, int]:
+        if not self._use_randr:
+            gdk_screen = Gdk.Screen.get_default()
+            if gdk_screen:
+                gdk_screen.connect('monitors-changed', self._on_screen_change)
+
+        self._refresh_monitors()
+
+    def _on_screen_change(self, *args):
+        self._refresh_monitors()
+
+    def _refresh_monitors(self):
+        monitors = []
+        try:
+            if self._use_randr:
+                monitors = self._query_randr_monitors()
+            else:
+                monitors = self._query_gdk_monitors()
+        except Exception as e:
+            print(f"Failed to query monitors: {e}")
+
+        if not monitors:
+            monitors = [Monitor('default', *self._get_fallback_geometry(), primary=True)]
+        if self._use_randr:
+            try:
+                self._apply_workareas(monitors)
+            except Exception as e:
+                print(f"Failed to read _NET_WORKAREA: {e}")
+            self.after_x11_round_trip()
+        self.monitors.update(monitors)
+
+    def _query_randr_monitors(self) -> List[Monitor]:
+        reply = self.display.screen().root.xrandr_get_monitors(is_active=True)
+        return [Monitor(self.display.get_atom_name(info.name), info.x, info.y,
+                        info.width_in_pixels, info.height_in_pixels, primary=bool(info.primary))
+                for info in reply.monitors]
+
+    def _query_gdk_monitors(self) -> List[Monitor]:
+        gdk_display = Gdk.Display.get_default()
+        monitors = []
+        for i in range(gdk_display.get_n_monitors()):
+            gdk_monitor = gdk_display.get_monitor(i)
+            geometry = gdk_monitor.get_geometry()
+            workarea = gdk_monitor.get_workarea()
+            # Models repeat on identical monitors, the index keeps names unique
+            model = gdk_monitor.get_model()
+            monitors.append(Monitor(f'{i}:{model}' if model else str(i),
+                                    geometry.x, geometry.y, geometry.width, geometry.height,
+                                    (workarea.x, workarea.y, workarea.width, workarea.height),
+                                    primary=gdk_monitor.is_primary()))
+        return monitors
+
+    def _get_fallback_geometry(self) -> Tuple[int, int, int, int]:
         if self.display:
             try:
                 screen = self.display.screen()
                 return 0, 0, screen.width_in_pixels, screen.height_in_pixels
             except:
                 pass
-        
+
         gdk_screen = Gdk.Screen.get_default()
-        return 0, 0, gdk_screen.get_width(), gdk_screen.get_height()
+        if gdk_screen:
+            return 0, 0, gdk_screen.get_width(), gdk_screen.get_height()
+        return 0, 0, 1920, 1080
+
+    def get_monitor_for_window(self, window) -> Optional[Monitor]:
+        geometry = self.get_window_geometry(window) if window else None
+        if geometry:
+            return self.monitors.monitor_for_rect(*geometry)
+        return self.monitors.primary
+
+    def get_screen_geometry(self, window=None) -> Tuple[int, int, int, int]:
+        """Geometry of the monitor holding window, the primary monitor if None"""
+        monitor = self.get_monitor_for_window(window)
+        return monitor.geometry
+
+    def get_workarea(self, window=None, monitor: Optional[Monitor] = None) -> Rect:
+        """Usable area (without panels and docks) of monitor or the one holding window"""
+        if monitor is None:
+            monitor = self.get_monitor_for_window(window)
+        if self.is_wayland and self.tree_cache:
+            try:
+                workareas = self.tree_cache.index().output_workareas
+            except SwayIPCError:
+                workareas = {}
+            for area in workareas.values():
+                if self.monitors.monitor_for_rect(*area) is monitor:
+                    return area
+        return monitor.workarea
+
+    def get_window_key(self, window):
+        """Stable hashable identity of a window across queries"""
+        if self.is_wayland:
+            return window.id
+        if hasattr(window, 'get_xid'):
+            return window.get_xid()
+        return id(window)
+
+    def get_window_geometry(self, window) -> Optional[Tuple[int, int, int, int]]:
+        if self.is_wayland:
+            return window.rect
+        if hasattr(window, 'get_geometry'):
+            geometry = self._call_on_main(window.get_geometry)
+            return tuple(geometry) if geometry else None
+        return None
+
+    def query_pointer(self) -> Optional[Tuple[int, int, bool]]:
+        """Pointer position and whether the left button is held, X11 only"""
+        if not self.display:
+            return None
+        reply = self.display.screen().root.query_pointer()
+        self.after_x11_round_trip()
+        return reply.root_x, reply.root_y, bool(reply.mask & X.Button1Mask)
 
     def get_active_window(self):
         if self.is_wayland:
             return self._get_wayland_active_window()
         else:
-            return self._get_x11_active_window()
+            return self._call_on_main(self._get_x11_active_window)
+
+    def get_active_window_key(self):
+        """Key of the active window without querying the compositor.
+
+        Returns None when that would need a round trip, for example while the
+        sway event subscription is not live.
+        """
+        if self.is_wayland:
+            if self.tree_cache and self.tree_cache.is_live:
+                return self.tree_cache.index().focused_id
+            return None
+        window = self._call_on_main(self._get_x11_active_window)
+        return window.get_xid() if window else None
 
     def _get_wayland_active_window(self):
         try:
-            result = subprocess.run(['swaymsg', '-t', 'get_tree'], 
-                                  capture_output=True, text=True, timeout=1)
-            if result.returncode == 0:
-                import json
-                tree = json.loads(result.stdout)
-                return self._find_focused_window(tree)
-        except:
+            return self.tree_cache.get_focused()
+        except SwayIPCError:
             pass
         return None
 
-    def _find_focused_window(self, node):
-        if node.get('focused', False):
-            return node
-        for child in node.get('nodes', []) + node.get('floating_nodes', []):
-            result = self._find_focused_window(child)
-            if result:
-                return result
-        return None
-
     def _get_x11_active_window(self):
         if self.screen:
             return self.screen.get_active_window()
@@ -101,24 +382,39 @@ class WindowManager:
         if self.is_wayland:
             self._wayland_move_resize(window, x, y, width, height)
         else:
-            self._x11_move_resize(window, x, y, width, height)
+            self._call_on_main(self._x11_move_resize, window, x, y, width, height)
+
+    def command_batch(self) -> CommandBatch:
+        return CommandBatch(self.sway)
 
     def _wayland_move_resize(self, window, x: int, y: int, width: int, height: int):
         try:
-            if window and 'id' in window:
-                commands = [
-                    f'[con_id="{window["id"]}"] floating enable',
-                    f'[con_id="{window["id"]}"] resize set {width} {height}',
-                    f'[con_id="{window["id"]}"] move position {x} {y}'
-                ]
-                for cmd in commands:
-                    subprocess.run(['swaymsg', cmd], timeout=1)
+            if window:
+                batch = self.command_batch()
+                batch.add('floating enable', window.id)
+                batch.add(f'resize set {width} {height}', window.id)
+                batch.add(f'move position {x} {y}', window.id)
+                results = batch.send()
+                for result in results:
+                    if not result.get('success', False):
+                        print(f"Wayland resize error: {result.get('error')}")
+                if results and all(result.get('success', False) for result in results):
+                    # The next animation starts from window.rect
+                    window.rect = (x, y, width, height)
+                    if self.tree_cache:
+                        self.tree_cache.set_rect(window.id, window.rect)
         except Exception as e:
             print(f"Wayland resize error: {e}")
 
     def _x11_move_resize(self, window, x: int, y: int, width: int, height: int):
-        if window and hasattr(window, 'set_geometry'):
+        if self.xlib_backend and hasattr(window, 'get_xid'):
+            self._xlib_move_resize(window, x, y, width, height)
+        elif window and hasattr(window, 'set_geometry'):
             try:
+                if window.is_maximized():
+                    window.unmaximize()
+                # set_geometry already corrects for the frame, only the raw
+                # EWMH path needs _adjust_for_frame
                 gravity = Wnck.WindowGravity.NORTHWEST
                 geometry_mask = (Wnck.WindowMoveResizeMask.X | 
                                Wnck.WindowMoveResizeMask.Y |
@@ -129,47 +425,58 @@ class WindowManager:
             except Exception as e:
                 print(f"X11 resize error: {e}")
 
+    def _xlib_move_resize(self, window, x: int, y: int, width: int, height: int):
+        try:
+            xid = window.get_xid()
+            x, y, width, height = self._adjust_for_frame(window, x, y, width, height)
+            # Unmaximize and move go out together in one flush
+            if window.is_maximized():
+                self.xlib_backend.queue_maximize(xid, False)
+            self.xlib_backend.queue_move_resize(xid, x, y, width, height)
+            self.xlib_backend.flush()
+        except Exception as e:
+            print(f"X11 resize error: {e}")
+
     def maximize_window(self, window):
         if self.is_wayland:
             try:
-                if window and 'id' in window:
-                    subprocess.run(['swaymsg', f'[con_id="{window["id"]}"] fullscreen'], timeout=1)
-            except:
+                if window:
+                    self.command_batch().add('fullscreen', window.id).send()
+            except SwayIPCError:
                 pass
         else:
-            if window and hasattr(window, 'maximize'):
-                window.maximize()
+            self._call_on_main(self._x11_maximize, window)
+
+    def _x11_maximize(self, window):
+        if self.xlib_backend and hasattr(window, 'get_xid'):
+            self.xlib_backend.queue_maximize(window.get_xid())
+            self.xlib_backend.flush()
+        elif window and hasattr(window, 'maximize'):
+            window.maximize()
 
     def get_window_list(self) -> List:
         if self.is_wayland:
             return self._get_wayland_windows()
         else:
-            return self._get_x11_windows()
+            return self._call_on_main(self._get_x11_windows)
 
     def _get_wayland_windows(self) -> List:
         try:
-            result = subprocess.run(['swaymsg', '-t', 'get_tree'], 
-                                  capture_output=True, text=True, timeout=1)
-            if result.returncode == 0:
-                import json
-                tree = json.loads(result.stdout)
-                windows = []
-                self._collect_windows(tree, windows)
-                return windows
-        except:
+            return self.tree_cache.get_windows()
+        except SwayIPCError:
             pass
         return []
 
-    def _collect_windows(self, node, windows):
-        if node.get('type') == 'con' and node.get('name'):
-            windows.append(node)
-        for child in node.get('nodes', []) + node.get('floating_nodes', []):
-            self._collect_windows(child, windows)
-
     def _get_x11_windows(self) -> List:
         windows = []
         if self.screen:
             for window in self.screen.get_windows():
                 if window.get_window_type() == Wnck.WindowType.NORMAL:
                     windows.append(window)
-        return windows
\ No newline at end of file
+        return windows
+
+    def cleanup(self):
+        if self.tree_cache:
+            self.tree_cache.stop()
+        if self.sway:
+            self.sway.close()
\ No newline at end of file
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+from typing import List
+
+from Xlib import X
+from Xlib.protocol import event
+
+# _NET_MOVERESIZE_WINDOW flag bits
+MOVERESIZE_X = 1 << 8
+MOVERESIZE_Y = 1 << 9
+MOVERESIZE_WIDTH = 1 << 10
+MOVERESIZE_HEIGHT = 1 << 11
+# Source indication: 2 = pager / window management tool
+SOURCE_PAGER = 2
+
+# _NET_WM_STATE actions
+STATE_REMOVE = 0
+STATE_ADD = 1
+STATE_TOGGLE = 2
+
+
+class XlibBackend:
+    """Move and resize windows with EWMH client messages on an Xlib connection.
+
+    Requests are only queued in python-xlib's output buffer, flush() sends
+    everything queued so far in a single write. This avoids libwnck's screen
+    model for the write path entirely.
+    """
+
+    def __init__(self, display):
+        self.display = display
+        self.root = display.screen().root
+        self._atoms = {}
+        for name in ('_NET_MOVERESIZE_WINDOW', '_NET_WM_STATE',
+                     '_NET_WM_STATE_MAXIMIZED_VERT', '_NET_WM_STATE_MAXIMIZED_HORZ'):
+            self._atoms[name] = display.intern_atom(name)
+        self.pending = 0
+
+    def _send(self, xid: int, message_type: str, data: List[int]):
+        window = self.display.create_resource_object('window', xid)
+        # Format 32 data is packed unsigned, negative coordinates wrap like in C
+        values = [value & 0xFFFFFFFF for value in (data + [0] * 5)[:5]]
+        message = event.ClientMessage(window=window, client_type=self._atoms[message_type],
+                                      data=(32, values))
+        self.root.send_event(message, event_mask=X.SubstructureRedirectMask | X.SubstructureNotifyMask)
+        self.pending += 1
+
+    def queue_move_resize(self, xid: int, x: int, y: int, width: int, height: int,
+                          gravity: int = X.NorthWestGravity):
+        flags = (gravity | MOVERESIZE_X | MOVERESIZE_Y | MOVERESIZE_WIDTH | MOVERESIZE_HEIGHT
+                 | SOURCE_PAGER << 12)
+        self._send(xid, '_NET_MOVERESIZE_WINDOW', [flags, x, y, width, height])
+
+    def queue_maximize(self, xid: int, maximize: bool = True):
+        action = STATE_ADD if maximize else STATE_REMOVE
+        self._send(xid, '_NET_WM_STATE', [action, self._atoms['_NET_WM_STATE_MAXIMIZED_VERT'],
+                                          self._atoms['_NET_WM_STATE_MAXIMIZED_HORZ'], SOURCE_PAGER])
+
+    def flush(self):
+        if self.pending:
+            self.display.flush()
+            self.pending = 0
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+from typing import Callable, Dict, Iterable, Tuple
+
+from Xlib import X, error
+from Xlib.ext import xtest
+
+# Hotkey manager modifier bits -> X modifier masks
+X_MODIFIER_MASKS = {1: X.Mod4Mask, 2: X.ControlMask, 4: X.Mod1Mask, 8: X.ShiftMask}
+RELEVANT_MASK = X.Mod4Mask | X.ControlMask | X.Mod1Mask | X.ShiftMask
+# CapsLock and NumLock must not stop a grab from matching
+IGNORED_MASKS = (0, X.LockMask, X.Mod2Mask, X.LockMask | X.Mod2Mask)
+# Shift_L .. Hyper_R and ISO_Level3_Shift, pressing these never ends a sequence
+MODIFIER_KEYSYMS = frozenset(range(0xffe1, 0xffef)) | {0xfe03}
+
+
+def keysym_for_key(key) -> int:
+    """X keysym of a pynput key, 0 if it has none"""
+    value = getattr(key, 'value', key)
+    char = getattr(value, 'char', None)
+    if char:
+        code = ord(char)
+        # Latin-1 keysyms equal their code point, the rest use the Unicode range
+        return code if code < 0x100 else 0x01000000 | code
+    return getattr(value, 'vk', None) or 0
+
+
+class XGrabKeyBackend:
+    """Passive XGrabKey grabs on the root window for the bound combos only.
+
+    Key events for the grabbed combos arrive on WindowManager's Xlib
+    connection and are dispatched from its GLib IO watch, so ordinary
+    typing never reaches Themis at all. While a sequence prefix is pending
+    the whole keyboard is grabbed briefly so the next stroke is seen too. A
+    stroke that turns out not to be a hotkey is sent again with XTEST once
+    the grab is released; without XTEST it is swallowed.
+    """
+
+    def __init__(self, window_manager, on_key: Callable):
+        self.window_manager = window_manager
+        self.display = window_manager.display
+        self.root = self.display.screen().root
+        self.on_key = on_key
+        self._grabs: Dict[Tuple[int, int], Tuple[object, int]] = {}
+        self._combos = []
+        self._sequence_keys = {}
+        self._keyboard_grabbed = False
+        self._can_replay = bool(self.display.query_extension('XTEST'))
+        window_manager.add_x11_handler(X.KeyPress, self._on_key_press)
+        window_manager.add_x11_handler(X.MappingNotify, self._on_mapping_notify)
+
+    def stop(self):
+        self.ungrab_keyboard()
+        self.ungrab_all()
+        self._combos = []
+        self.window_manager.remove_x11_handler(X.KeyPress, self._on_key_press)
+        self.window_manager.remove_x11_handler(X.MappingNotify, self._on_mapping_notify)
+
+    def set_grabs(self, combos: Iterable[Tuple[object, int]], sequence_keys: Iterable = ()):
+        """Grab exactly the given (trigger key, modifier bits) combos.
+
+        sequence_keys are the keys that can follow a sequence prefix, they
+        are only reported while the keyboard is grabbed.
+        """
+        self.ungrab_all()
+        self._combos = list(combos)
+        self._sequence_keys = {keysym_for_key(key): key for key in sequence_keys}
+        catcher = error.CatchError(error.BadAccess)
+        for trigger, modifiers in self._combos:
+            keysym = keysym_for_key(trigger)
+            keycode = self.display.keysym_to_keycode(keysym) if keysym else 0
+            if not keycode:
+                print(f"No keycode for hotkey key {trigger}")
+                continue
+            x_mask = 0
+            for bit, mask in X_MODIFIER_MASKS.items():
+                if modifiers & bit:
+                    x_mask |= mask
+            for ignored in IGNORED_MASKS:
+                self.root.grab_key(keycode, x_mask | ignored, True, X.GrabModeAsync,
+                                   X.GrabModeAsync, onerror=catcher)
+            self._grabs[(keycode, x_mask)] = (trigger, modifiers)
+        self.display.sync()
+        self.window_manager.after_x11_round_trip()
+        if catcher.get_error():
+            print("Some hotkeys are already grabbed by another application")
+
+    def ungrab_all(self):
+        for keycode, x_mask in self._grabs:
+            for ignored in IGNORED_MASKS:
+                self.root.ungrab_key(keycode, x_mask | ignored)
+        self._grabs = {}
+        self.display.flush()
+
+    def grab_keyboard(self):
+        if self._keyboard_grabbed:
+            return
+        status = self.root.grab_keyboard(True, X.GrabModeAsync, X.GrabModeAsync, X.CurrentTime)
+        self._keyboard_grabbed = status == X.GrabSuccess
+
+    def ungrab_keyboard(self):
+        if self._keyboard_grabbed:
+            self._keyboard_grabbed = False
+            self.display.ungrab_keyboard(X.CurrentTime)
+            self.display.flush()
+
+    def _on_key_press(self, event):
+        grab = self._grabs.get((event.detail, event.state & RELEVANT_MASK))
+        if grab:
+            self.on_key(*grab)
+        elif self._keyboard_grabbed:
+            keysym = self.display.keycode_to_keysym(event.detail, 0)
+            if keysym in MODIFIER_KEYSYMS:
+                return
+            if 0xff80 <= keysym <= 0xffbd and keysym not in self._sequence_keys:
+                # Level 0 of a keypad key is KP_End etc., level 1 holds KP_1
+                keysym = self.display.keycode_to_keysym(event.detail, 1)
+            modifiers = 0
+            for bit, mask in X_MODIFIER_MASKS.items():
+                if event.state & mask:
+                    modifiers |= bit
+            # Keys no sequence uses are reported as None, which ends the prefix
+            if not self.on_key(self._sequence_keys.get(keysym), modifiers):
+                self._replay(event)
+
+    def _replay(self, event):
+        # on_key has ended the prefix, so the keyboard is no longer grabbed
+        # and the stroke reaches the focused window. The held modifiers are
+        # still down. The release is faked too, the XTEST device would
+        # otherwise keep the key pressed.
+        if not self._can_replay or self._keyboard_grabbed:
+            return
+        try:
+            xtest.fake_input(self.display, X.KeyPress, event.detail)
+            xtest.fake_input(self.display, X.KeyRelease, event.detail)
+            self.display.flush()
+        except Exception as e:
+            print(f"Could not replay key: {e}")
+
+    def _on_mapping_notify(self, event):
+        self.display.refresh_keyboard_mapping(event)
+        if event.request == X.MappingKeyboard and self._combos:
+            self.set_grabs(self._combos, self._sequence_keys.values())